@@ -170,9 +170,69 @@ else:
     ui.hook.idb.add('set_func_end', __import__('hooks').set_func_end, 40)
 [ ui.hook.idb.add(_, getattr(__import__('hooks'), _), 40) for _ in ('thunk_func_created', 'func_tail_appended') ]
 
+## discard the block model of a function when its flags or any of the references it depends on change
+if idaapi.__version__ < 7.0:
+    [ ui.hook.idp.add(_, __import__('hooks').xref_changed, 40) for _ in ('add_cref', 'add_dref', 'del_cref', 'del_dref') ]
+else:
+    [ ui.hook.idp.add(_, __import__('hooks').xref_changed, 40) for _ in ('ev_add_cref', 'ev_add_dref', 'ev_del_cref', 'ev_del_dref') ]
+    ui.hook.idb.add('func_updated', __import__('hooks').func_updated, 40)
+ui.hook.idb.add('func_noret_changed', __import__('hooks').func_updated, 40)
+ui.hook.idb.add('tail_owner_changed', __import__('hooks').tail_owner_changed, 40)
+
 ## rebase the entire tagcache when the entire database is rebased.
 ui.hook.idb.add('allsegs_moved', __import__('hooks').rebase, 50)
 
+## discard any cached bytes or instructions when the database gets patched or its items change
+ui.hook.idb.add('byte_patched', __import__('hooks').byte_patched, 40)
+[ ui.hook.idb.add(_, getattr(__import__('hooks'), _), 40) for _ in ('make_code', 'make_data') ]
+if idaapi.__version__ >= 7.0:
+    ui.hook.idb.add('destroyed_items', __import__('hooks').destroyed_items, 40)
+
+## discard the cached layout of a structure or frame when it or any of its members are modified
+[ ui.hook.idb.add(_, __import__('hooks').struc_changed, 40) for _ in ('struc_member_created', 'struc_member_deleted', 'struc_member_renamed', 'struc_member_changed', 'struc_expanded', 'deleting_struc', 'struc_cmt_changed') ]
+
+## discard the lookup tables of an enumeration when it or any of its members are modified
+[ ui.hook.idb.add(_, __import__('hooks').enum_changed, 40) for _ in ('enum_created', 'deleting_enum', 'renaming_enum', 'enum_bf_changed', 'enum_cmt_changed', 'enum_member_created', 'deleting_enum_member') ]
+
+## store the call graph index whenever the database is saved, and discard it if the database is rebased
+if idaapi.__version__ < 7.0:
+    ui.hook.idp.add('savebase', database.callgraph.__savebase__, 40)
+else:
+    ui.hook.idb.add('savebase', database.callgraph.__savebase__, 40)
+ui.hook.idb.add('allsegs_moved', database.callgraph.__rebase__, 50)
+
+## discard the table of segments whenever a segment is added, removed, or changed
+[ ui.hook.idb.add(_, seg.cache.clear, 40) for _ in ('segm_added', 'segm_deleted', 'segm_start_changed', 'segm_end_changed', 'segm_moved', 'allsegs_moved') ]
+if idaapi.__version__ >= 7.0:
+    ui.hook.idb.add('segm_name_changed', seg.cache.clear, 40)
+
+## discard the segment table and any decoded instructions when the bitness or segment registers of a segment change
+[ ui.hook.idb.add(_, __import__('hooks').segm_attrs_changed, 40) for _ in ('segm_attrs_changed', 'segm_attrs_updated') if hasattr(idaapi.IDB_Hooks, _) ]
+if hasattr(idaapi.IDB_Hooks, 'sgr_changed'):
+    ui.hook.idb.add('sgr_changed', __import__('hooks').sgr_changed, 40)
+
+## rebuild the import and entry point tables once the loader has finished or the database is rebased
+if idaapi.__version__ < 7.0:
+    ui.hook.idp.add('loader_finished', database.imports.__changed__, 40)
+    ui.hook.idp.add('loader_finished', database.entries.__invalidate__, 40)
+else:
+    ui.hook.idb.add('loader_finished', database.imports.__changed__, 40)
+    ui.hook.idb.add('loader_finished', database.entries.__invalidate__, 40)
+ui.hook.idb.add('allsegs_moved', database.imports.__changed__, 50)
+ui.hook.idb.add('allsegs_moved', database.entries.__invalidate__, 50)
+ui.hook.idb.add('allsegs_moved', database.xref.__changed__, 50)
+
+## discard the table of marks whenever one is changed through the ui
+if hasattr(idaapi.IDB_Hooks, 'bookmark_changed'):
+    ui.hook.idb.add('bookmark_changed', database.marks.__invalidate__, 40)
+
+## keep track of whether the references have changed since the database was opened or saved
+[ ui.hook.idb.add(_, __import__('hooks').type_changed, 40) for _ in ('op_type_changed', 'op_ti_changed', 'ti_changed') ]
+if idaapi.__version__ < 7.0:
+    ui.hook.idp.add('savebase', database.xref.__reset__, 40)
+else:
+    ui.hook.idb.add('savebase', database.xref.__reset__, 40)
+
 ## switch the instruction set when the processor is switched
 if idaapi.__version__ < 7.0:
     ui.hook.idp.add('newprc', instruction.__newprc__, 50)
@@ -10,7 +10,7 @@ individuals to attempt to understand this craziness.
 import six
 import sys, logging
 import functools, operator, itertools, types
-import collections, heapq, traceback, ctypes
+import collections, heapq, traceback, ctypes, array, bisect
 
 import ui, internal
 import idaapi
@@ -120,9 +120,39 @@ class typemap:
                                         #   structures that have the flag set
                                         #   but aren't actually structures..
 
+    # caches for the results of resolve and dissolve
+    __resolved__, __dissolved__, __maximum__ = collections.OrderedDict(), collections.OrderedDict(), 0x400
+
+    @classmethod
+    def __invalidate__(cls):
+        '''Discard all of the types that were cached by `resolve` or `dissolve`.'''
+        cls.__resolved__.clear()
+        cls.__dissolved__.clear()
+
+    @classmethod
+    def __key__(cls, pythonType):
+        '''Return a hashable key for the provided `pythonic-type` or None if it is unable to be cached.'''
+        if isinstance(pythonType, [].__class__):
+            res, count = pythonType
+            key = cls.__key__(res)
+            return None if key is None else ([].__class__, key, count)
+
+        # structures are keyed by their identifier since a new instance is made every time one is fetched
+        elif isinstance(pythonType, sys.modules.get('structure', __import__('structure')).structure_t):
+            return idaapi.FF_STRU, pythonType.id
+
+        elif isinstance(pythonType, ().__class__):
+            res = tuple(cls.__key__(item) for item in pythonType)
+            return None if any(key is None for key in res) else (().__class__,) + res
+
+        try: hash(pythonType)
+        except TypeError: return None
+        return pythonType
+
     # defaults
     @classmethod
     def __newprc__(cls, pnum):
+        cls.__invalidate__()
         info = idaapi.get_inf_structure()
         bits = 64 if info.is_64bit() else 32 if info.is_32bit() else None
         if bits is None: return
@@ -139,6 +169,19 @@ class typemap:
     @classmethod
     def dissolve(cls, flag, typeid, size):
         '''Convert the specified ``flag``, ``typeid``, and ``size`` into a pythonic type.'''
+        key = flag, typeid, size
+        if key in cls.__dissolved__:
+            res = cls.__dissolved__[key]
+        else:
+            res = cls.__dissolve(flag, typeid, size)
+            while len(cls.__dissolved__) >= cls.__maximum__:
+                cls.__dissolved__.popitem(last=False)
+            cls.__dissolved__[key] = res
+
+        # arrays are modified by the caller, so hand them a copy
+        return res[:] if isinstance(res, [].__class__) else res
+    @classmethod
+    def __dissolve(cls, flag, typeid, size):
         dt = flag & cls.FF_MASKSIZE
         sf = -1 if flag & idaapi.FF_SIGN == idaapi.FF_SIGN else +1
         if dt == idaapi.FF_STRU and isinstance(typeid, six.integer_types):
@@ -163,6 +206,18 @@ class typemap:
     @classmethod
     def resolve(cls, pythonType):
         '''Convert the provided `pythonic-type` to IDA's ``(flag, typeid, size)``.'''
+        key = cls.__key__(pythonType)
+        if key is None:
+            return cls.__resolve(pythonType)
+        elif key in cls.__resolved__:
+            return cls.__resolved__[key]
+        res = cls.__resolve(pythonType)
+        while len(cls.__resolved__) >= cls.__maximum__:
+            cls.__resolved__.popitem(last=False)
+        cls.__resolved__[key] = res
+        return res
+    @classmethod
+    def __resolve(cls, pythonType):
         sz, count = None, 1
         # FIXME: figure out how to fix this recursive module dependency
 
@@ -175,7 +230,7 @@ class typemap:
         elif isinstance(pythonType, [].__class__):
             # an array, which requires us to recurse...
             res, count = pythonType
-            flag, typeid, sz = cls.resolve(res)
+            flag, typeid, sz = cls.__resolve(res)
 
         elif isinstance(pythonType, sys.modules.get('structure', __import__('structure')).structure_t):
             # it's a structure, pass it through.
@@ -1201,3 +1256,309 @@ class bounds_t(namedtypedtuple):
     """
     _fields = ('left', 'right')
     _types = (six.integer_types, six.integer_types)
+
+class columns_t(namedtypedtuple):
+    """
+    This tuple is used to represent a number of decoded instructions as
+    parallel arrays and has the format ``(address, size, itype, feature,
+    mnemonic, offset, optype, opvalue, opreg, opsize, opstate)``.
+
+    The first four fields contain one entry for each instruction, and
+    ``mnemonic`` maps each ``itype`` to its name. The operands of the
+    instruction at index ``i`` are found from ``offset[i]`` up to
+    ``offset[i + 1]`` of each of the ``op`` fields. The ``opstate`` of
+    an operand has bit 0 set when it is read and bit 1 when it is written.
+    """
+    _fields = ('address', 'size', 'itype', 'feature', 'mnemonic', 'offset', 'optype', 'opvalue', 'opreg', 'opsize', 'opstate')
+    _types = ((array.array, list), array.array, array.array, array.array, dict, array.array, array.array, (array.array, list), array.array, array.array, array.array)
+
+class xrefs_t(namedtypedtuple):
+    """
+    This tuple is used to represent a number of cross-references as
+    parallel arrays and has the format ``(frm, to, type, iscode)``.
+
+    The reference at index ``i`` is from the address ``frm[i]`` to
+    the address ``to[i]``. Its ``type`` is one of IDA's ``fl_*`` or
+    ``dr_*`` values and ``iscode`` is set when it is a code reference.
+    """
+    _fields = ('frm', 'to', 'type', 'iscode')
+    _types = ((array.array, list), (array.array, list), array.array, array.array)
+
+class blockmodel_t(object):
+    """
+    This object represents the basic blocks of a function that were
+    calculated by an `idaapi.FlowChart`. The boundaries of each block
+    are stored in arrays that are sorted by address so that a block can
+    be found with a binary search, and the successors and predecessors
+    of each block are stored as indices in compressed-sparse-row form.
+
+    The `idaapi.FlowChart` that was used to build the model is kept so
+    that the ``blocks`` attribute can contain its `idaapi.BasicBlock`
+    instances ordered by their block id.
+    """
+    def __init__(self, flowchart):
+        self.flowchart = flowchart
+        self.blocks = [flowchart[index] for index in six.moves.range(flowchart.size)]
+
+        # sort each block by its address so that we can bisect them
+        order = sorted(six.moves.range(len(self.blocks)), key=lambda index: self.blocks[index].startEA)
+        self.start = [self.blocks[index].startEA for index in order]
+        self.end = [self.blocks[index].endEA for index in order]
+        self.order = array.array('L', order)
+
+        # now we can build the adjacency for each block using its id
+        self.succ_offset, self.succ = array.array('L', [0]), array.array('L')
+        self.pred_offset, self.pred = array.array('L', [0]), array.array('L')
+        for bb in self.blocks:
+            self.succ.extend(item.id for item in bb.succs())
+            self.pred.extend(item.id for item in bb.preds())
+            self.succ_offset.append(len(self.succ)), self.pred_offset.append(len(self.pred))
+        return
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def __repr__(self):
+        cls = self.__class__
+        return "<{:s} {:d} block{:s} {:d} edge{:s}>".format(cls.__name__, len(self.blocks), '' if len(self.blocks) == 1 else 's', len(self.succ), '' if len(self.succ) == 1 else 's')
+
+    def index(self, ea):
+        '''Return the id of the block containing the address ``ea`` or ``None`` if it is not in any block.'''
+        res = bisect.bisect_right(self.start, ea) - 1
+        if res >= 0 and ea < self.end[res]:
+            return self.order[res]
+        return None
+
+    def at(self, ea):
+        '''Return the `idaapi.BasicBlock` containing the address ``ea`` or ``None`` if it is not in any block.'''
+        res = self.index(ea)
+        return None if res is None else self.blocks[res]
+
+    def overlaps(self, start, end):
+        '''Return true if any of the blocks overlap the addresses ``start`` to ``end``.'''
+        res = bisect.bisect_left(self.start, end) - 1
+        return res >= 0 and self.end[res] > start
+
+    def successors(self, id):
+        '''Return the ids of the blocks that succeed the block ``id``.'''
+        return self.succ[self.succ_offset[id] : self.succ_offset[id + 1]]
+
+    def predecessors(self, id):
+        '''Return the ids of the blocks that precede the block ``id``.'''
+        return self.pred[self.pred_offset[id] : self.pred_offset[id + 1]]
+
+class digraph_t(object):
+    """
+    This object represents a directed graph whose edges are stored in
+    compressed-sparse-row form. Each node is identified by its index
+    into the ``nodes`` attribute, and the successors of the node with
+    index ``i`` are the indices in ``succ[succ_offset[i]:succ_offset[i+1]]``.
+    The predecessors are derived from the successors when constructed.
+
+    The attributes of each node are not fetched until they are asked
+    for. If an ``attributes`` callable was provided, it will be called
+    with the index of a node the first time its attributes are needed
+    and the result will be kept for any subsequent requests.
+    """
+    def __init__(self, nodes, offset, edges, entry=0, attributes=None):
+        self.nodes, self.entry = nodes, entry
+        self.succ_offset, self.succ = offset, edges
+        self.__index = {node : index for index, node in enumerate(nodes)}
+        self.__getter, self.__attributes = attributes, {}
+
+        # count the in-degree of each node so that we can lay out the predecessors
+        count = array.array('L', [0] * (len(nodes) + 1))
+        for target in edges:
+            count[target + 1] += 1
+        for index in six.moves.range(len(nodes)):
+            count[index + 1] += count[index]
+
+        # now we can drop each edge directly into its slot
+        self.pred_offset, self.pred = array.array('L', count), array.array('L', [0] * len(edges))
+        for source in six.moves.range(len(nodes)):
+            for target in self.successors(source):
+                self.pred[count[target]] = source
+                count[target] += 1
+            continue
+        return
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __repr__(self):
+        cls = self.__class__
+        return "<{:s} {:d} node{:s} {:d} edge{:s}>".format(cls.__name__, len(self.nodes), '' if len(self.nodes) == 1 else 's', len(self.succ), '' if len(self.succ) == 1 else 's')
+
+    def __contains__(self, node):
+        return node in self.__index
+
+    def index(self, node):
+        '''Return the index of the specified ``node``.'''
+        return self.__index[node]
+
+    def successors(self, index):
+        '''Return the indices of the nodes that succeed the node at ``index``.'''
+        return self.succ[self.succ_offset[index] : self.succ_offset[index + 1]]
+
+    def predecessors(self, index):
+        '''Return the indices of the nodes that precede the node at ``index``.'''
+        return self.pred[self.pred_offset[index] : self.pred_offset[index + 1]]
+
+    def edges(self):
+        '''Yield each edge in the graph as a ``(source, target)`` tuple of indices.'''
+        for source in six.moves.range(len(self.nodes)):
+            for target in self.successors(source):
+                yield source, target
+            continue
+        return
+
+    def attributes(self, index):
+        '''Return the attributes for the node at ``index``.'''
+        if index not in self.__attributes:
+            self.__attributes[index] = {} if self.__getter is None else self.__getter(index)
+        return self.__attributes[index]
+
+    def reachable(self, index=None, reverse=False):
+        '''Return the set of node indices that are reachable from the node at ``index``, following the edges backwards if ``reverse`` is true.'''
+        adjacent = self.predecessors if reverse else self.successors
+        start = self.entry if index is None else index
+        res, stack = {start}, [start]
+        while stack:
+            for item in adjacent(stack.pop()):
+                if item not in res:
+                    res.add(item)
+                    stack.append(item)
+                continue
+            continue
+        return res
+
+    def postorder(self, index=None):
+        '''Return a list of the node indices reachable from ``index`` in depth-first post-order.'''
+        start = self.entry if index is None else index
+        res, visited = [], {start}
+        stack = [(start, iter(self.successors(start)))]
+        while stack:
+            node, children = stack[-1]
+            for item in children:
+                if item not in visited:
+                    visited.add(item)
+                    stack.append((item, iter(self.successors(item))))
+                    break
+                continue
+            else:
+                res.append(node)
+                stack.pop()
+            continue
+        return res
+
+    def rpo(self, index=None):
+        '''Return a list of the node indices reachable from ``index`` in reverse post-order.'''
+        return self.postorder(index)[::-1]
+    topological = rpo
+
+    def dominators(self):
+        """Return a list containing the immediate dominator for the index of each node.
+
+        The entry node is its own immediate dominator, and any node that is not
+        reachable from the entry will have an immediate dominator of ``None``.
+        """
+        order = self.rpo()
+        position = {node : index for index, node in enumerate(order)}
+
+        # iterate until a fixed point as described by Cooper, Harvey, and Kennedy.
+        res = [None] * len(self.nodes)
+        res[self.entry] = self.entry
+        changed = True
+        while changed:
+            changed = False
+            for node in order[1:]:
+                idom = None
+                for item in self.predecessors(node):
+                    if res[item] is None:
+                        continue
+                    elif idom is None:
+                        idom = item
+                        continue
+
+                    # walk both fingers up the tree until they meet
+                    left, right = item, idom
+                    while left != right:
+                        while position[left] > position[right]:
+                            left = res[left]
+                        while position[right] > position[left]:
+                            right = res[right]
+                        continue
+                    idom = left
+                if res[node] != idom:
+                    res[node], changed = idom, True
+                continue
+            continue
+        return res
+
+    def dominates(self, dominator, index, tree=None):
+        '''Return true if the node at ``dominator`` dominates the node at ``index``. If ``tree`` is specified, then use it as the result of `digraph_t.dominators`.'''
+        idom = self.dominators() if tree is None else tree
+        if idom[index] is None:
+            return False
+        while index != dominator:
+            if index == self.entry:
+                return False
+            index = idom[index]
+        return True
+
+    def scc(self):
+        '''Return a list of the strongly connected components in the graph with each component being a list of node indices.'''
+        res, counter = [], itertools.count()
+        number, lowlink, onstack, components = {}, {}, set(), []
+
+        # Tarjan's algorithm, but using an explicit stack instead of recursing
+        for root in six.moves.range(len(self.nodes)):
+            if root in number:
+                continue
+            number[root] = lowlink[root] = next(counter)
+            components.append(root), onstack.add(root)
+            stack = [(root, iter(self.successors(root)))]
+            while stack:
+                node, children = stack[-1]
+                for item in children:
+                    if item not in number:
+                        number[item] = lowlink[item] = next(counter)
+                        components.append(item), onstack.add(item)
+                        stack.append((item, iter(self.successors(item))))
+                        break
+                    elif item in onstack:
+                        lowlink[node] = min(lowlink[node], number[item])
+                    continue
+                else:
+                    stack.pop()
+                    if stack:
+                        parent, _ = stack[-1]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+                    # if this node is a root, then pop off its component
+                    if lowlink[node] == number[node]:
+                        component = []
+                        while True:
+                            item = components.pop()
+                            onstack.discard(item)
+                            component.append(item)
+                            if item == node: break
+                        res.append(component)
+                    continue
+                continue
+            continue
+        return res
+
+    def networkx(self, *args, **attrs):
+        """Convert the graph into a `networkx.DiGraph` using the address of each node.
+
+        Any ``args`` or ``attrs`` are passed to the `networkx.DiGraph` constructor.
+        Requires the `networkx` module in order to build the graph.
+        """
+        import networkx
+        res = networkx.DiGraph(*args, **attrs)
+        for index, node in enumerate(self.nodes):
+            res.add_node(node, **self.attributes(index))
+        for source, target in self.edges():
+            res.add_edge(self.nodes[source], self.nodes[target])
+        return res
@@ -16,8 +16,6 @@ import sys, heapq, collections
 
 import multiprocessing, Queue
 
-import idaapi
-
 __all__ = ['fbox','fboxed','funbox','finstance','fhasitem','fitemQ','fgetitem','fitem','fhasattr','fattributeQ','fgetattr','fattribute','fconstant','fpassthru','fdefault','fpass','fidentity','fid','first','second','third','last','fcompose','fdiscard','fcondition','fmap','flazy','fmemo','fpartial','fapply','fcurry','frpartial','freversed','fexc','fexception','fcatch','fcomplement','fnot','ilist','liter','ituple','titer','itake','iget','imap','ifilter','ichain','izip','count']
 
 ### functional programming primitives (FIXME: probably better to document these with examples)
@@ -716,6 +714,77 @@ def spawn(stdout, command, **options):
     # spawn the sub-process
     return process(command, stdout=stdout, stderr=stderr, **options)
 
+## interface for distributing work across a pool of processes
+def mapreduce(F, iterable, extract=fidentity, reduce=None, initial=None, **options):
+    """Execute the callable ``F`` on the payload extracted from each item in ``iterable`` using a pool of processes.
+
+    Each payload is extracted by calling ``extract`` with an item from the
+    current thread, so it is safe for it to call into IDA. The payloads
+    are then sent to the pool in batches whilst the next batch is being
+    extracted, which requires both ``F`` and the payloads to be picklable.
+    If ``reduce`` is specified, each result is merged with it starting with
+    ``initial``. Otherwise a list of the results is returned in order.
+
+    If the callable ``progress`` is given, it will be called with the
+    number of completed items and the total every ``interval`` seconds.
+    When it returns true, the pool will be terminated and the results that
+    were merged so far will be returned. The ``processes`` option is the
+    size of the pool and ``batch`` is the number of items in each batch.
+    By default ``processes`` is 0 and ``F`` will be executed in the current
+    process. The ``executable`` option specifies the python interpreter
+    for the pool to use and is required on platforms that spawn their
+    processes, as otherwise the pool would be started with IDA itself.
+    """
+    processes, progress = options.get('processes', 0), options.get('progress', None)
+    interval, batch = options.get('interval', 0.5), options.get('batch', 0x40)
+    merge = (lambda result, item: result.append(item) or result) if reduce is None else reduce
+
+    items = builtins.list(iterable)
+    result, total, completed = [] if reduce is None else initial, len(items), 0
+
+    # if we weren't asked for any processes, then just run everything in-process
+    if not processes:
+        pool, apply = None, lambda payloads: builtins.map(F, payloads)
+    elif sys.platform == 'win32' and not options.get('executable', None):
+        raise OSError("{:s}.mapreduce(...) : Refusing to start a pool of {:d} process{:s} without the path to a python interpreter as the \"executable\" option.".format(__name__, processes, '' if processes == 1 else 'es'))
+    else:
+        options.get('executable', None) and multiprocessing.set_executable(options['executable'])
+        pool = multiprocessing.Pool(processes)
+        apply = lambda payloads: pool.map_async(F, payloads)
+
+    # extract each batch in the current thread and give it to the pool while we extract the next one
+    ts, pending = time.time(), None
+    try:
+        for index in six.moves.range(0, total, batch):
+            payloads = builtins.map(extract, items[index : index + batch])
+            if pending is not None:
+                for res in (pending if pool is None else pending.get()):
+                    result = merge(result, res)
+                completed = index
+
+            # throttle how often we update the progress
+            if progress and time.time() - ts >= interval:
+                ts = time.time()
+                if progress(completed, total):
+                    logging.warn("{:s}.mapreduce(...) : Terminating after {:d} of {:d} item{:s} were completed.".format(__name__, completed, total, '' if total == 1 else 's'))
+                    break
+            pending = apply(payloads)
+
+        # merge whatever is still being processed
+        else:
+            if pending is not None:
+                for res in (pending if pool is None else pending.get()):
+                    result = merge(result, res)
+                completed = total
+            progress and progress(completed, total)
+
+    except KeyboardInterrupt:
+        logging.warn("{:s}.mapreduce(...) : Interrupted after {:d} of {:d} item{:s} were completed.".format(__name__, completed, total, '' if total == 1 else 's'))
+
+    finally:
+        pool is not None and pool.terminate()
+    return result
+
 ### scheduler
 class execution(object):
     __slots__ = ('queue','state','result','ev_unpaused','ev_terminating')
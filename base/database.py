@@ -22,8 +22,8 @@ import six
 from six.moves import builtins
 
 import functools, operator, itertools, types
-import sys, os, logging
-import math, array, fnmatch, re, ctypes
+import sys, os, logging, weakref
+import math, array, fnmatch, re, ctypes, struct, bisect
 
 import function, segment
 import structure as _structure, instruction as _instruction
@@ -325,7 +325,7 @@ class functions(object):
         '''List all of the functions in the database that match the keyword specified by ``type``.'''
         res = builtins.list(cls.iterate(**type))
 
-        flvars = lambda ea: _structure.fragment(function.frame(ea).id, 0, function.get_vars_size(ea)) if function.by(ea).frsize else []
+        flvars = lambda ea: function.frame.fragment(ea, 0, function.get_vars_size(ea)) if function.by(ea).frsize else []
         fminaddr = utils.fcompose(function.chunks, functools.partial(itertools.imap, operator.itemgetter(0)), min)
         fmaxaddr = utils.fcompose(function.chunks, functools.partial(itertools.imap, operator.itemgetter(-1)), max)
 
@@ -338,14 +338,18 @@ class functions(object):
         marks = max(builtins.map(utils.fcompose(function.marks, builtins.list, len), res) or [1])
         blocks = max(builtins.map(utils.fcompose(function.blocks, builtins.list, len), res) or [1])
         exits = max(builtins.map(utils.fcompose(function.bottom, builtins.list, len), res) or [1])
-        lvars = max(builtins.map(utils.fcompose(lambda ea: flvars(ea) if function.by(ea).frsize else [], builtins.list, len), res) or [1])
+
+        # count the frame members once so that we don't need to walk the frame again when listing
+        nlvars = {ea : len(builtins.list(flvars(ea))) for ea in res}
+        lvars = max(nlvars.itervalues() if nlvars else [1])
 
         # FIXME: fix function.arguments so that it works on non-stackbased functions
         fargs = function.arguments
         try:
-            args = max(builtins.map(utils.fcompose(lambda ea: fargs(ea) if function.by(ea).frsize else [], builtins.list, len), res) or [1])
+            nargs = {ea : len(builtins.list(fargs(ea))) if function.by(ea).frsize else 0 for ea in res}
         except RuntimeError:
-            args, fargs = 1, lambda ea: []
+            nargs = {}
+        args = max(nargs.itervalues() if nargs else [1])
 
         cindex = math.ceil(math.log(maxindex or 1)/math.log(10)) if maxindex else 1
         try: cmaxoffset = math.floor(math.log(offset(maxentry)) or 1)/math.log(16)
@@ -367,8 +371,8 @@ class functions(object):
                 fminaddr(ea), int(cminaddr), fmaxaddr(ea), int(cmaxaddr),
                 len(list(function.chunks(ea))), int(cchunks),
                 function.name(ea), int(maxname),
-                len(list(fargs(ea))) if function.by(ea).frsize else 0, int(cargs),
-                len(list(flvars(ea))), int(clvars),
+                nargs.get(ea, 0), int(cargs),
+                nlvars[ea], int(clvars),
                 len(list(function.blocks(ea))), int(cblocks),
                 len(list(function.bottom(ea))), int(cexits),
                 len(list(function.marks(ea))), int(cmarks)
@@ -536,7 +540,223 @@ def write(ea, data, **persist):
     """
     ea, _ = interface.address.within(ea, ea + len(data))
     originalQ = builtins.next((persist[k] for k in ('original', 'persist', 'store', 'save') if k in persist), False)
-    return idaapi.patch_many_bytes(ea, data) if originalQ else idaapi.put_many_bytes(ea, data)
+    try:
+        return idaapi.patch_many_bytes(ea, data) if originalQ else idaapi.put_many_bytes(ea, data)
+    finally:
+        view.__invalidate__(ea, ea + len(data))
+        _instruction.cache.discard(ea, ea + len(data))
+
+class view(object):
+    """
+    This class represents a view of the bytes between two addresses
+    within the database. The contents of the view are fetched from the
+    database one page at a time as they are accessed, and are cached
+    so that repeatedly slicing or unpacking the same region does not
+    need to read it from the database again.
+
+    Any pages that are modified by `database.write` or by IDA patching
+    a byte will be discarded and then re-read when next accessed.
+
+    Some ways of using a view are::
+
+        > v = database.view(ea, ea + 0x1000)
+        > print v[0x10:0x20].encode('hex')
+        > magic, = v.unpack_from('<L', 0x3c)
+        > mv = v.memoryview(0x100, 0x20)
+
+    """
+    PAGE_SIZE = 0x1000
+    __views__ = weakref.WeakSet()
+
+    @utils.multicase()
+    def __init__(self):
+        '''Create a view of the current segment.'''
+        seg = ui.current.segment()
+        if seg is None:
+            raise LookupError("{:s}() : Not currently positioned within a segment.".format('.'.join((__name__, self.__class__.__name__))))
+        self.__init__(seg.startEA, seg.endEA)
+    @utils.multicase(start=six.integer_types, end=six.integer_types)
+    def __init__(self, start, end):
+        '''Create a view of the bytes from the address ``start`` to ``end``.'''
+        if start > end:
+            start, end = end, start
+        self.start, self.end = interface.address.within(start, end)
+        self.__data__ = bytearray(self.end - self.start)
+        self.__pages__ = set()
+        self.__views__.add(self)
+
+    @classmethod
+    def __invalidate__(cls, start, end):
+        '''Discard any pages that overlap the addresses ``start`` to ``end`` from each view.'''
+        for item in builtins.list(cls.__views__):
+            item.invalidate(start, end)
+        return
+
+    def invalidate(self, start, end):
+        '''Discard any cached pages that overlap the addresses ``start`` to ``end``.'''
+        left, right = max(start, self.start), min(end, self.end)
+        if left >= right:
+            return
+        first, last = (left - self.start) // self.PAGE_SIZE, (right - self.start - 1) // self.PAGE_SIZE
+        self.__pages__.difference_update(six.moves.range(first, last + 1))
+
+    def __fetch__(self, offset, size):
+        '''Ensure that every page from ``offset`` for ``size`` bytes has been read from the database.'''
+        if offset < 0 or offset + size > len(self.__data__):
+            raise IndexError("{:s}({:#x}, {:#x}) : The requested range {:+#x}<>{:+#x} is outside the bounds of the view.".format('.'.join((__name__, self.__class__.__name__)), self.start, self.end, offset, offset + size))
+        if size <= 0:
+            return
+
+        first, last = offset // self.PAGE_SIZE, (offset + size - 1) // self.PAGE_SIZE
+        for page in six.moves.range(first, last + 1):
+            if page in self.__pages__: continue
+            left = page * self.PAGE_SIZE
+            right = min(left + self.PAGE_SIZE, len(self.__data__))
+
+            # if the page couldn't be read, then fall back to reading each
+            # byte individually and treating any missing ones as zero.
+            res = idaapi.get_many_bytes(self.start + left, right - left)
+            if res is None:
+                res = ''.join(idaapi.get_many_bytes(ea, 1) or '\0' for ea in six.moves.range(self.start + left, self.start + right))
+            self.__data__[left : right] = res
+            self.__pages__.add(page)
+        return
+
+    def __len__(self):
+        return len(self.__data__)
+
+    def __getitem__(self, index):
+        '''Return the byte at ``index`` or the bytes within the slice ``index``.'''
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self.__data__))
+            if start < stop:
+                self.__fetch__(start, stop - start)
+            return bytes(self.__data__[index])
+        res = index + len(self.__data__) if index < 0 else index
+        self.__fetch__(res, 1)
+        return six.int2byte(self.__data__[res])
+
+    def __getslice__(self, i, j):
+        return self.__getitem__(slice(i, j))
+
+    def __repr__(self):
+        return "{:s} {:#x}<>{:#x} ({:d} of {:d} page{:s} cached)".format(object.__repr__(self), self.start, self.end, len(self.__pages__), (len(self.__data__) + self.PAGE_SIZE - 1) // self.PAGE_SIZE, '' if len(self.__pages__) == 1 else 's')
+
+    def memoryview(self, offset, size):
+        '''Return a `memoryview` of ``size`` bytes at ``offset`` of the view without copying them.'''
+        self.__fetch__(offset, size)
+        return builtins.memoryview(self.__data__)[offset : offset + size]
+
+    def unpack_from(self, format, offset=0):
+        '''Unpack the structure described by ``format`` at ``offset`` of the view using `struct.unpack_from`.'''
+        self.__fetch__(offset, struct.calcsize(format))
+        return struct.unpack_from(format, self.__data__, offset)
+
+    def read(self, offset, size):
+        '''Return ``size`` bytes at ``offset`` of the view.'''
+        return self[offset : offset + size]
+
+class batch(object):
+    """
+    This class is used to collect a number of writes to the database so
+    that they can be applied all at once. Writes that are adjacent to or
+    overlap one another are coalesced into a single write, and each of
+    the resulting ranges is queued for reanalysis only once. If writes
+    overlap, then the one that was made last takes precedence.
+
+    When a batch is applied, the original bytes for each range are kept
+    in an undo log (``batch.log``) so that the batch can be reverted. Any
+    keywords given to the batch are passed to `database.write`.
+
+    Some ways of using this class are::
+
+        > with database.batch() as b:
+              b.write(ea, '\\x90' * 5)
+              b.write(ea + 5, '\\xcc')
+        > b.undo()
+
+        > b = database.batch(persist=True)
+        > b.write(ea, data)
+        > log = b.apply()
+
+    """
+    def __init__(self, **persist):
+        self.persist, self.log = persist, []
+        self.__writes__ = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.apply()
+        return
+
+    def __len__(self):
+        return len(self.__writes__)
+
+    def __repr__(self):
+        return "{:s} {:d} pending write{:s} ({:d} in undo log)".format(object.__repr__(self), len(self.__writes__), '' if len(self.__writes__) == 1 else 's', len(self.log))
+
+    @utils.multicase(data=bytes)
+    def write(self, data):
+        '''Queue a write of the bytes specified by ``data`` to the current address.'''
+        return self.write(ui.current.address(), data)
+    @utils.multicase(ea=six.integer_types, data=bytes)
+    def write(self, ea, data):
+        '''Queue a write of the bytes specified by ``data`` to the address ``ea``.'''
+        ea, _ = interface.address.within(ea, ea + len(data))
+        if data: self.__writes__.append((ea, data))
+        return len(data)
+
+    def ranges(self):
+        '''Return a sorted list of each ``(address, data)`` that will be written after coalescing the queued writes.'''
+        bounds = []
+        for ea, data in sorted(self.__writes__, key=operator.itemgetter(0)):
+            if bounds and ea <= bounds[-1][1]:
+                bounds[-1][1] = max(bounds[-1][1], ea + len(data))
+                continue
+            bounds.append([ea, ea + len(data)])
+
+        # now replay each write in the order it was made so that the last one wins
+        starts, buffers = [left for left, _ in bounds], [bytearray(right - left) for left, right in bounds]
+        for ea, data in self.__writes__:
+            index = bisect.bisect_right(starts, ea) - 1
+            offset = ea - starts[index]
+            buffers[index][offset : offset + len(data)] = data
+        return [(ea, bytes(data)) for ea, data in zip(starts, buffers)]
+
+    def apply(self):
+        '''Apply each of the queued writes to the database and return the undo log.'''
+        res = self.ranges()
+
+        # read all of the original bytes first so that nothing is written if one fails
+        log = []
+        for ea, data in res:
+            original = read(ea, len(data))
+            if len(original) != len(data):
+                raise ValueError("{:s}.apply() : Unable to read the original {:+#x} bytes at {:#x} for the undo log.".format('.'.join((__name__, self.__class__.__name__)), len(data), ea))
+            log.append((ea, original))
+
+        # now we can write each range and queue it for reanalysis
+        for ea, data in res:
+            write(ea, data, **self.persist)
+            idaapi.auto_mark_range(ea, ea + len(data), idaapi.AU_USED)
+            ui.navigation.analyze(ea)
+
+        self.__writes__[:] = []
+        self.log.extend(log)
+        return log
+
+    def undo(self):
+        '''Revert each write that was applied by the batch and return the number of ranges that were restored.'''
+        res = self.__class__(**self.persist)
+        for ea, data in reversed(self.log):
+            res.write(ea, data)
+        res.apply()
+
+        count, self.log[:] = len(self.log), []
+        return count
 
 class names(object):
     """
@@ -679,6 +899,11 @@ class search(object):
     parameter ``predicate``. One can provide one of the search methods provided
     or include their own. This function will then yield each matched search
     result.
+
+    To search for many byte patterns at once, `search.by_patterns` can be used.
+    This will snapshot the contents of the database and scan it in a single
+    pass for every pattern, yielding the id of each pattern that was matched
+    along with its address.
     """
 
     @utils.multicase(string=bytes)
@@ -784,6 +1009,122 @@ class search(object):
             ea = predicate(address.next(ea), string)
         return
 
+    @staticmethod
+    def __pattern__(string):
+        '''Convert the hex pattern ``string`` into a tuple of its ``(regex, length)``.'''
+        tokens = builtins.map(lambda token: '??' if token == '?' else token, string.split())
+        if any(len(token) % 2 for token in tokens):
+            raise ValueError("{:s}.by_patterns(...) : Unable to parse the pattern {!r} as one of its tokens is not aligned to a byte.".format('.'.join((__name__, search.__name__)), string))
+        nibbles = ''.join(tokens)
+
+        # convert each pair of nibbles into its regex
+        res = []
+        for index, (hi, lo) in enumerate(zip(nibbles[0::2], nibbles[1::2])):
+            try:
+                if hi == '?' and lo == '?':
+                    res.append('.')
+                elif hi == '?':
+                    res.append("[{:s}]".format(''.join(re.escape(six.int2byte(n << 4 | int(lo, 16))) for n in six.moves.range(0x10))))
+                elif lo == '?':
+                    res.append("[{:s}-{:s}]".format(re.escape(six.int2byte(int(hi, 16) << 4)), re.escape(six.int2byte(int(hi, 16) << 4 | 0xf))))
+                else:
+                    res.append(re.escape(six.int2byte(int(hi + lo, 16))))
+            except ValueError:
+                raise ValueError("{:s}.by_patterns(...) : Unable to parse the nibbles {!r} at index {:d} of the pattern {!r}.".format('.'.join((__name__, search.__name__)), hi + lo, index, string))
+            continue
+
+        if not res:
+            raise ValueError("{:s}.by_patterns(...) : Refusing to search for an empty pattern ({!r}).".format('.'.join((__name__, search.__name__)), string))
+        return ''.join(res), len(res)
+
+    @staticmethod
+    def __read__(ea, size):
+        '''Return each ``(offset, bytes)`` for the runs of bytes that can be read from the ``size`` bytes at the address ``ea``.'''
+        res, stack = [], [(0, size)]
+
+        # if a range can't be read, then split it in half until we find the bytes that can be
+        while stack:
+            offset, length = stack.pop()
+            data = idaapi.get_many_bytes(ea + offset, length) if length > 0 else None
+            if data is not None and len(data) == length:
+                if res and res[-1][0] + len(res[-1][1]) == offset:
+                    res[-1] = res[-1][0], res[-1][1] + data
+                else:
+                    res.append((offset, data))
+            elif length > 1:
+                half = length // 2
+                stack.append((offset + half, length - half)), stack.append((offset, half))
+            continue
+        return res
+
+    @utils.multicase(patterns=(builtins.list, builtins.tuple, builtins.dict))
+    @staticmethod
+    def by_patterns(patterns, **options):
+        '''Yield each ``(pattern_id, address)`` for the hex ``patterns`` that are found within all of the segments in the database.'''
+        for seg in segment.__iterate__():
+            for item in search.by_patterns(seg.startEA, seg.endEA, patterns, **options):
+                yield item
+            continue
+        return
+    @utils.multicase(start=six.integer_types, end=six.integer_types, patterns=(builtins.list, builtins.tuple, builtins.dict))
+    @staticmethod
+    def by_patterns(start, end, patterns, **options):
+        """Yield each ``(pattern_id, address)`` for the hex ``patterns`` that are found between the addresses ``start`` and ``end``.
+
+        Each pattern is a string of hex bytes (such as "E8 ?? ?? ?? ?? 8B 4?") where a "?" represents a wildcard nibble.
+        If ``patterns`` is a dictionary, then its keys are used as the pattern id. Otherwise the index of the pattern is used.
+        If ``chunk`` is specified, then snapshot the database ``chunk`` bytes at a time while scanning.
+        """
+        if start > end:
+            start, end = end, start
+        chunk = options.get('chunk', 0x100000)
+
+        # compile every pattern into a single regex so that each chunk is only
+        # scanned once. each pattern is a group so we know which one matched.
+        ids, lengths, compiled = [], [], []
+        for id, string in (six.iteritems(patterns) if isinstance(patterns, builtins.dict) else enumerate(patterns)):
+            regex, length = search.__pattern__(string)
+            ids.append(id), lengths.append(length), compiled.append(regex)
+
+        if not ids:
+            return
+        combined = re.compile("(?={:s})".format('|'.join("({:s})".format(regex) for regex in compiled)), re.DOTALL)
+        compiled, overlap = [re.compile(regex, re.DOTALL) for regex in compiled], max(lengths) - 1
+
+        # snapshot the database one chunk at a time, carrying the last bytes of
+        # each chunk into the next one so that matches crossing it are found.
+        ea, carry = start, ''
+        while ea < end:
+            size, res = min(chunk, end - ea), []
+            runs, previous, carry = search.__read__(ea, size), carry, ''
+            if sum(len(data) for _, data in runs) < size:
+                logging.info("{:s}.by_patterns({:#x}, {:#x}, ...) : Only {:+#x} of the {:+#x} bytes at {:#x} could be read.".format('.'.join((__name__, search.__name__)), start, end, sum(len(data) for _, data in runs), size, ea))
+
+            for offset, data in runs:
+                prefix = '' if offset else previous
+                buffer, base = prefix + data, ea + offset - len(prefix)
+
+                # a match only tells us the first pattern at its position, so check the rest of them
+                # there. anything that fits entirely within the carried bytes was already yielded.
+                for match in combined.finditer(buffer):
+                    position, index = match.start(), match.lastindex - 1
+                    for item in itertools.chain([index], (item for item in six.moves.range(index + 1, len(ids)) if compiled[item].match(buffer, position))):
+                        if position + lengths[item] > len(prefix):
+                            res.append((ids[item], base + position))
+                        continue
+                    continue
+
+                # only bytes that run into the next chunk can be carried into it
+                if overlap and offset + len(data) == size:
+                    carry = buffer[-overlap:]
+                continue
+
+            for item in sorted(res, key=operator.itemgetter(1)):
+                yield item
+            ea += size
+        return
+    byPatterns = utils.alias(by_patterns, 'search')
+
     def __new__(cls, string):
         '''Search through the database for the specified ``string``.'''
         return cls.by_name(ui.current.address(), string)
@@ -1021,17 +1362,46 @@ class entries(object):
     """
 
     __matcher__ = utils.matcher()
-    __matcher__.mapping('address', utils.fcompose(idaapi.get_entry_ordinal, idaapi.get_entry))
-    __matcher__.mapping('ea', utils.fcompose(idaapi.get_entry_ordinal, idaapi.get_entry))
-    __matcher__.boolean('greater', operator.le, utils.fcompose(idaapi.get_entry_ordinal, idaapi.get_entry)), __matcher__.boolean('gt', operator.lt, utils.fcompose(idaapi.get_entry_ordinal, idaapi.get_entry))
-    __matcher__.boolean('less', operator.ge, utils.fcompose(idaapi.get_entry_ordinal, idaapi.get_entry)), __matcher__.boolean('lt', operator.gt, utils.fcompose(idaapi.get_entry_ordinal, idaapi.get_entry))
-    __matcher__.boolean('name', operator.eq, utils.fcompose(idaapi.get_entry_ordinal,idaapi.get_entry_name))
-    __matcher__.boolean('like', lambda v, n: fnmatch.fnmatch(n, v), utils.fcompose(idaapi.get_entry_ordinal,idaapi.get_entry_name))
-    __matcher__.boolean('regex', re.search, utils.fcompose(idaapi.get_entry_ordinal,idaapi.get_entry_name))
-    __matcher__.predicate('predicate', idaapi.get_entry_ordinal)
-    __matcher__.predicate('pred', idaapi.get_entry_ordinal)
+    __matcher__.mapping('address', lambda index: entries.__entryaddress__(index))
+    __matcher__.mapping('ea', lambda index: entries.__entryaddress__(index))
+    __matcher__.boolean('greater', operator.le, lambda index: entries.__entryaddress__(index)), __matcher__.boolean('gt', operator.lt, lambda index: entries.__entryaddress__(index))
+    __matcher__.boolean('less', operator.ge, lambda index: entries.__entryaddress__(index)), __matcher__.boolean('lt', operator.gt, lambda index: entries.__entryaddress__(index))
+    __matcher__.boolean('name', operator.eq, lambda index: entries.__entryname__(index))
+    __matcher__.boolean('like', lambda v, n: fnmatch.fnmatch(n, v), lambda index: entries.__entryname__(index))
+    __matcher__.boolean('regex', re.search, lambda index: entries.__entryname__(index))
+    __matcher__.predicate('predicate', lambda index: entries.__entryordinal__(index))
+    __matcher__.predicate('pred', lambda index: entries.__entryordinal__(index))
     __matcher__.boolean('index', operator.eq)
 
+    # the table of entry points
+    __cache__ = None
+
+    @classmethod
+    def __invalidate__(cls, *args):
+        '''Discard the table of entry points.'''
+        cls.__cache__ = None
+
+    @classmethod
+    def __table__(cls):
+        """Return the table of entry points for the database.
+
+        The table is a tuple composed of a list of the ordinal, address, and name for
+        each entry point ordered by index, and a dictionary of each address and ordinal
+        to the index of its entry point.
+        """
+        count = idaapi.get_entry_qty()
+        if cls.__cache__ is not None and len(cls.__cache__[0]) == count:
+            return cls.__cache__
+
+        ordinals, addresses, names, byaddress, byordinal = [], [], [], {}, {}
+        for index in six.moves.range(count):
+            ordinal = idaapi.get_entry_ordinal(index)
+            ea = idaapi.get_entry(ordinal)
+            ordinals.append(ordinal), addresses.append(ea), names.append(idaapi.get_entry_name(ordinal))
+            byaddress.setdefault(ea, index), byordinal.setdefault(ordinal, index)
+        cls.__cache__ = res = ordinals, addresses, names, byaddress, byordinal
+        return res
+
     def __new__(cls):
         '''Yield the address of each entry point defined within the database.'''
         for ea in cls.iterate():
@@ -1046,7 +1416,7 @@ class entries(object):
     @classmethod
     def __iterate__(cls, **type):
         if not type: type = {'predicate':lambda n: True}
-        res = six.moves.range(idaapi.get_entry_qty())
+        res = six.moves.range(len(cls.__table__()[0]))
         for key, value in six.iteritems(type):
             res = builtins.list(cls.__matcher__.match(key, value, res))
         for item in res: yield item
@@ -1066,23 +1436,30 @@ class entries(object):
     @classmethod
     def __index__(cls, ea):
         '''Returns the index of the entry point at the specified ``address``.'''
-        f = utils.fcompose(idaapi.get_entry_ordinal, idaapi.get_entry)
-        iterable = itertools.imap(utils.fcompose(utils.fmap(f, lambda n:n), builtins.tuple), six.moves.range(idaapi.get_entry_qty()))
-        filterable = itertools.ifilter(utils.fcompose(utils.first, functools.partial(operator.eq, ea)), iterable)
-        result = itertools.imap(utils.second, filterable)
-        return builtins.next(result, None)
+        _, _, _, byaddress, _ = cls.__table__()
+        return byaddress.get(ea, None)
 
     @classmethod
     def __address__(cls, index):
         '''Returns the address of the entry point at the specified ``index``.'''
-        res = cls.__entryordinal__(index)
-        res = idaapi.get_entry(res)
+        res = cls.__entryaddress__(index)
         return None if res == idaapi.BADADDR else res
 
-    # Returns the name of the entry point at the specified ``index``.
-    __entryname__ = staticmethod(utils.fcompose(idaapi.get_entry_ordinal, idaapi.get_entry_name))
-    # Returns the ordinal of the entry point at the specified ``index``.
-    __entryordinal__ = staticmethod(idaapi.get_entry_ordinal)
+    @classmethod
+    def __entryaddress__(cls, index):
+        '''Returns the address of the entry point at the specified ``index`` which may be ``idaapi.BADADDR``.'''
+        _, addresses, _, _, _ = cls.__table__()
+        return addresses[index]
+    @classmethod
+    def __entryname__(cls, index):
+        '''Returns the name of the entry point at the specified ``index``.'''
+        _, _, names, _, _ = cls.__table__()
+        return names[index]
+    @classmethod
+    def __entryordinal__(cls, index):
+        '''Returns the ordinal of the entry point at the specified ``index``.'''
+        ordinals, _, _, _, _ = cls.__table__()
+        return ordinals[index]
 
     @utils.multicase()
     @classmethod
@@ -1123,12 +1500,12 @@ class entries(object):
         '''List all of the entry points in the database that match the keyword specified by ``type``.'''
         res = builtins.list(cls.__iterate__(**type))
 
-        to_address = utils.fcompose(idaapi.get_entry_ordinal, idaapi.get_entry)
+        to_address = cls.__entryaddress__
         to_numlen = utils.fcompose("{:x}".format, len)
 
         maxindex = max(res+[1])
         maxaddr = max(builtins.map(to_address, res) or [idaapi.BADADDR])
-        maxordinal = max(builtins.map(idaapi.get_entry_ordinal, res) or [1])
+        maxordinal = max(builtins.map(cls.__entryordinal__, res) or [1])
         cindex = math.ceil(math.log(maxindex or 1)/math.log(10))
         caddr = math.floor(math.log(maxaddr or 1)/math.log(16))
         cordinal = math.floor(math.log(maxordinal or 1)/math.log(16))
@@ -1151,7 +1528,7 @@ class entries(object):
         res = builtins.list(cls.__iterate__(**type))
         if len(res) > 1:
             builtins.map(logging.info, (("[{:d}] {:x} : ({:x}) {:s}".format(idx, cls.__address__(idx), cls.__entryordinal__(idx), cls.__entryname__(idx))) for idx in res))
-            f = utils.fcompose(idaapi.get_entry_ordinal, idaapi.get_entry)
+            f = cls.__entryaddress__
             logging.warn("{:s}.search({:s}) : Found {:d} matching results, Returning the first entry point at {:#x}.".format('.'.join((__name__, cls.__name__)), query_s, len(res), f(res[0])))
 
         res = builtins.next(iter(res), None)
@@ -1196,6 +1573,7 @@ class entries(object):
     def new(cls, ea, name, ordinal):
         '''Adds an entry point at ``ea`` with the specified ``name`` and ``ordinal``.'''
         res = idaapi.add_entry(ordinal, interface.address.inside(ea), name, 0)
+        cls.__invalidate__()
         ui.state.wait()
         return res
 
@@ -1493,20 +1871,54 @@ class imports(object):
     __matcher__.predicate('pred', lambda n:n)
     __matcher__.mapping('index', utils.first)
 
+    # the import table, the generation of the database that it was built for, and the segments containing its imports
+    __cache__, __generation__, __segments__ = None, 0, builtins.set()
+
     @classmethod
-    def __iterate__(cls):
-        """Iterate through all of the imports in the database.
+    def __changed__(cls, *args):
+        '''Notify the namespace that the imports in the database might have changed.'''
+        cls.__generation__ += 1
 
-        Yields ``(address, (module, name, ordinal))`` for each iteration.
+    @classmethod
+    def __table__(cls):
+        """Return the import table for the database.
+
+        The table is a tuple composed of a list of each import address, a list of each
+        ``(module, name, ordinal)``, and a dictionary of each address, ``(module, name)``,
+        and ``(module, ordinal)`` to the index of its import.
         """
-        for idx in six.moves.range(idaapi.get_import_module_qty()):
+        generation, count = cls.__generation__, idaapi.get_import_module_qty()
+        if cls.__cache__ is not None:
+            res, (gen, qty) = cls.__cache__
+            if (gen, qty) == (generation, count):
+                return res
+
+        # enumerate the imports for every module exactly once
+        addresses, entries, byaddress, bynames, byordinals = [], [], {}, {}, {}
+        for idx in six.moves.range(count):
             module = idaapi.get_import_module_name(idx)
             result = []
             idaapi.enum_import_names(idx, utils.fcompose(utils.fbox, result.append, utils.fconstant(True)))
             for ea, name, ordinal in result:
-                yield ea, (module, name, ordinal)
+                index = len(addresses)
+                addresses.append(ea), entries.append((module, name, ordinal))
+                byaddress.setdefault(ea, index)
+                if name: bynames.setdefault((module, name), index)
+                if ordinal: byordinals.setdefault((module, ordinal), index)
             continue
-        return
+        res = addresses, entries, byaddress, bynames, byordinals
+        cls.__segments__ = {seg.startEA for seg in builtins.map(idaapi.getseg, builtins.set(addresses)) if seg}
+        cls.__cache__ = res, (generation, count)
+        return res
+
+    @classmethod
+    def __iterate__(cls):
+        """Iterate through all of the imports in the database.
+
+        Yields ``(address, (module, name, ordinal))`` for each iteration.
+        """
+        addresses, entries, _, _, _ = cls.__table__()
+        return itertools.izip(addresses, entries)
 
     @utils.multicase(string=basestring)
     @classmethod
@@ -1534,11 +1946,9 @@ class imports(object):
     def at(cls, ea):
         '''Return the import at the address ``ea``.'''
         ea = interface.address.inside(ea)
-        res = itertools.ifilter(utils.fcompose(utils.first, functools.partial(operator.eq, ea)), cls.__iterate__())
-        try:
-            return utils.second(builtins.next(res))
-        except StopIteration:
-            pass
+        _, entries, byaddress, _, _ = cls.__table__()
+        if ea in byaddress:
+            return entries[byaddress[ea]]
         raise LookupError("{:s}.at({:#x}) : Unable to determine import at specified address.".format('.'.join((__name__, cls.__name__)), ea))
 
     @utils.multicase()
@@ -1551,10 +1961,10 @@ class imports(object):
     def module(cls, ea):
         '''Return the import module at the specified address ``ea``.'''
         ea = interface.address.inside(ea)
-        for addr, (module, _, _) in cls.__iterate__():
-            if addr == ea:
-                return module
-            continue
+        _, entries, byaddress, _, _ = cls.__table__()
+        if ea in byaddress:
+            module, _, _ = entries[byaddress[ea]]
+            return module
         raise LookupError("{:s}.module({:#x}) : Unable to determine import module name at specified address.".format('.'.join((__name__, cls.__name__)), ea))
 
     # specific parts of the import
@@ -1592,6 +2002,23 @@ class imports(object):
         _, _, ordinal = cls.at(ea)
         return ordinal
 
+    @utils.multicase(module=basestring, name=basestring)
+    @classmethod
+    def address(cls, module, name):
+        '''Return the address of the import with the specified ``name`` from ``module``.'''
+        addresses, _, _, bynames, _ = cls.__table__()
+        if (module, name) in bynames:
+            return addresses[bynames[module, name]]
+        raise LookupError("{:s}.address({!r}, {!r}) : Unable to locate an import with the specified name.".format('.'.join((__name__, cls.__name__)), module, name))
+    @utils.multicase(module=basestring, ordinal=six.integer_types)
+    @classmethod
+    def address(cls, module, ordinal):
+        '''Return the address of the import with the specified ``ordinal`` from ``module``.'''
+        addresses, _, _, _, byordinals = cls.__table__()
+        if (module, ordinal) in byordinals:
+            return addresses[byordinals[module, ordinal]]
+        raise LookupError("{:s}.address({!r}, {:d}) : Unable to locate an import with the specified ordinal.".format('.'.join((__name__, cls.__name__)), module, ordinal))
+
     # FIXME: maybe implement a modules class for getting information on import modules
     @classmethod
     def modules(cls):
@@ -1739,11 +2166,12 @@ class address(object):
             ## XXX: in later versions of ida, is_basic_block_end takes two args (ea, bool call_insn_stops_block)
 
             # skip call instructions
-            if _instruction.is_call(ea):
+            res = _instruction.classify(ea)
+            if res & _instruction.classes.CALL:
                 continue
 
             # halting instructions terminate a block
-            if _instruction.is_return(ea):
+            if res & _instruction.classes.RETURN:
                 yield block, nextea
                 block = ea
 
@@ -3207,6 +3635,8 @@ class xref(object):
         else:
             flowtype = idaapi.fl_CN if isCall else idaapi.fl_JN
         idaapi.add_cref(ea, target, flowtype | idaapi.XREF_USER)
+        xref.__changed__()
+        callgraph.__invalidate__(ea, ea + 1)
         return target in xref.code_down(ea)
     ac = utils.alias(add_code, 'xref')
 
@@ -3226,6 +3656,8 @@ class xref(object):
         isWrite = reftype.get('write', False)
         flowtype = idaapi.dr_W if isWrite else idaapi.dr_R
         idaapi.add_dref(ea, target, flowtype | idaapi.XREF_USER)
+        xref.__changed__()
+        callgraph.__invalidate__(ea, ea + 1)
         return target in xref.data_down(ea)
     ad = utils.alias(add_data, 'xref')
 
@@ -3235,6 +3667,8 @@ class xref(object):
         '''Delete _all_ the code references at ``ea``.'''
         ea = interface.address.inside(ea)
         [ idaapi.del_cref(ea, target, 0) for target in xref.code_down(ea) ]
+        xref.__changed__()
+        callgraph.__invalidate__(ea, ea + 1)
         return False if len(xref.code_down(ea)) > 0 else True
     @utils.multicase(ea=six.integer_types, target=six.integer_types)
     @staticmethod
@@ -3242,6 +3676,8 @@ class xref(object):
         '''Delete any code references at ``ea`` that point to address ``target``.'''
         ea = interface.address.inside(ea)
         idaapi.del_cref(ea, target, 0)
+        xref.__changed__()
+        callgraph.__invalidate__(ea, ea + 1)
         return target not in xref.code_down(ea)
 
     @utils.multicase(ea=six.integer_types)
@@ -3250,6 +3686,8 @@ class xref(object):
         '''Delete _all_ the data references at ``ea``.'''
         ea = interface.address.inside(ea)
         [ idaapi.del_dref(ea, target) for target in xref.data_down(ea) ]
+        xref.__changed__()
+        callgraph.__invalidate__(ea, ea + 1)
         return False if len(xref.data_down(ea)) > 0 else True
     @utils.multicase(ea=six.integer_types, target=six.integer_types)
     @staticmethod
@@ -3257,6 +3695,8 @@ class xref(object):
         '''Delete any data references at ``ea`` that point to address ``target``.'''
         ea = interface.address.inside(ea)
         idaapi.del_dref(ea, target)
+        xref.__changed__()
+        callgraph.__invalidate__(ea, ea + 1)
         return target not in xref.data_down(ea)
 
     @staticmethod
@@ -3264,6 +3704,149 @@ class xref(object):
         '''Clear all references at the address ``ea``.'''
         ea = interface.address.inside(ea)
         return all(ok for ok in (xref.del_code(ea), xref.del_data(ea)))
+
+    ## bulk extraction
+    __version__, __generation__, __session__ = 1, 0, None
+    marshaller = __import__('marshal')
+
+    @classmethod
+    def __changed__(cls, *args):
+        '''Notify the namespace that the references within the database may have changed.'''
+        cls.__generation__ += 1
+
+    @classmethod
+    def __reset__(cls, *args):
+        '''Notify the namespace that the references within the database are the same as the ones that are stored on disk.'''
+        cls.__generation__, cls.__session__ = 0, os.urandom(0x10)
+
+    @utils.multicase()
+    @classmethod
+    def dump(cls, **options):
+        '''Return every reference within the database as an `interface.xrefs_t` of parallel arrays.'''
+        left, right = config.bounds()
+        return cls.dump(left, right, **options)
+    @utils.multicase(start=six.integer_types, end=six.integer_types)
+    @classmethod
+    def dump(cls, start, end, **options):
+        """Return every reference from the addresses within ``start`` and ``end`` as an `interface.xrefs_t` of parallel arrays.
+
+        If ``kinds`` is specified, then it is a collection containing any of
+        "code", "data", or "flow" and is used to choose which references are
+        returned. By default this is the code and data references without the
+        ordinary flow between instructions. If the int ``chunk`` is specified,
+        then an iterator is returned that yields an `interface.xrefs_t` for
+        every ``chunk`` references. If ``cache`` is specified as a path (or as
+        true to use a path next to the database), then the references will be
+        stored there and reused for as long as the database is unchanged.
+        """
+        kinds = builtins.frozenset(options.get('kinds', ('code', 'data')))
+        if kinds - {'code', 'data', 'flow'}:
+            raise ValueError("{:s}.dump({:#x}, {:#x}, kinds={!r}) : An unknown kind of reference ({:s}) was specified.".format('.'.join((__name__, cls.__name__)), start, end, sorted(kinds), ', '.join(sorted(kinds - {'code', 'data', 'flow'}))))
+
+        # figure out where the dump is cached and what identifies it
+        path = options.get('cache', None)
+        path = "{:s}.xrefs".format(config.idb()) if path is True else path
+        key = cls.__key__(start, end, kinds) if path else None
+
+        # if the cache is good, then split it up instead of walking the database
+        res = cls.__load__(path, key) if key else None
+        if res is not None:
+            iterable = cls.__split__(res, options['chunk']) if options.get('chunk', 0) > 0 else iter([res])
+        else:
+            iterable = cls.__iterate__(start, end, kinds, options.get('chunk', 0), path if key else None, key)
+        return iterable if options.get('chunk', 0) > 0 else builtins.next(iterable)
+
+    @classmethod
+    def __arrays__(cls):
+        '''Return a new list of empty arrays for each field of an `interface.xrefs_t`.'''
+        wide = array.array('L').itemsize * 8 >= config.bits()
+        frm, to = (array.array('L'), array.array('L')) if wide else ([], [])
+        return [frm, to, array.array('B'), array.array('B')]
+
+    @classmethod
+    def __iterate__(cls, start, end, kinds, chunk, path, key):
+        '''Yield an `interface.xrefs_t` for every ``chunk`` references from ``start`` to ``end``, storing them at ``path`` when finished.'''
+        flags = idaapi.XREF_ALL if 'flow' in kinds else idaapi.XREF_FAR
+        code, data, flow = 'code' in kinds, 'data' in kinds, 'flow' in kinds
+
+        # walk through every head collecting the references from it
+        result, total, x = cls.__arrays__(), cls.__arrays__() if path else None, idaapi.xrefblk_t()
+        frm, to, xtype, iscode = result
+        for ea in address.iterate(start, end):
+            ok = x.first_from(ea, flags)
+            while ok:
+                # ordinary flow is its own kind of code reference, so it's only included when asked for
+                if (flow if x.type == idaapi.fl_F else code) if x.iscode else data:
+                    frm.append(ea), to.append(x.to), xtype.append(x.type), iscode.append(1 if x.iscode else 0)
+                ok = x.next_from()
+
+            # if we've collected enough references, then hand them off
+            if chunk > 0 and len(frm) >= chunk:
+                if total: [T.extend(item) for T, item in builtins.zip(total, result)]
+                yield interface.xrefs_t(*result)
+                result = cls.__arrays__()
+                frm, to, xtype, iscode = result
+            continue
+
+        if total:
+            [T.extend(item) for T, item in builtins.zip(total, result)]
+            cls.__save__(path, key, interface.xrefs_t(*total))
+        if chunk <= 0 or len(frm):
+            yield interface.xrefs_t(*result)
+        return
+
+    @classmethod
+    def __split__(cls, xrefs, chunk):
+        '''Yield an `interface.xrefs_t` for every ``chunk`` references in ``xrefs``.'''
+        for index in six.moves.range(0, len(xrefs.frm), chunk):
+            yield interface.xrefs_t(*(item[index : index + chunk] for item in xrefs))
+        return
+
+    @classmethod
+    def __key__(cls, start, end, kinds):
+        '''Return the key that identifies a dump of the references from ``start`` to ``end`` for the current state of the database.'''
+        try:
+            st = os.stat(config.idb())
+        except (OSError, IOError):
+            return None
+        md5 = idaapi.retrieve_input_file_md5()
+
+        # once the database has been changed, the generation only means something to the current session
+        session = cls.__session__ if cls.__generation__ else None
+        return cls.__version__, config.idb(), st.st_mtime, st.st_size, md5 if isinstance(md5, bytes) else None, session, cls.__generation__, start, end, tuple(sorted(kinds))
+
+    @classmethod
+    def __load__(cls, path, key):
+        '''Return the references that were stored at ``path`` if they were stored with ``key``.'''
+        try:
+            with open(path, 'rb') as infile:
+                res, fields = cls.marshaller.load(infile)
+        except (OSError, IOError, EOFError, ValueError, TypeError):
+            return None
+        if res != key:
+            return None
+
+        # convert each field back into its array
+        result = []
+        for typecode, item in fields:
+            if typecode is None:
+                result.append(builtins.list(item))
+                continue
+            res = array.array(typecode)
+            res.fromstring(item)
+            result.append(res)
+        return interface.xrefs_t(*result)
+
+    @classmethod
+    def __save__(cls, path, key, xrefs):
+        '''Store the references in ``xrefs`` at ``path`` using ``key`` to identify them.'''
+        fields = [(item.typecode, item.tostring()) if isinstance(item, array.array) else (None, item) for item in xrefs]
+        try:
+            with open(path, 'wb') as outfile:
+                cls.marshaller.dump((key, fields), outfile)
+        except (OSError, IOError), e:
+            logging.warn("{:s}.dump(...) : Unable to store the references to {!r} ({!s}).".format('.'.join((__name__, cls.__name__)), path, e))
+        return
 x = xref    # XXX: ns alias
 
 drefs, crefs = utils.alias(xref.data, 'xref'), utils.alias(xref.code, 'xref')
@@ -3271,6 +3854,317 @@ dxdown, dxup = utils.alias(xref.data_down, 'xref'), utils.alias(xref.data_up, 'x
 cxdown, cxup = utils.alias(xref.code_down, 'xref'), utils.alias(xref.code_up, 'xref')
 up, down = utils.alias(xref.up, 'xref'), utils.alias(xref.down, 'xref')
 
+class callgraph(object):
+    """
+    This namespace is for querying an index of the calls that are made
+    between all of the functions within the database. The index is
+    built in a single pass over every function and contains each call
+    site along with the address that it targets. Once built, the index
+    is stored within a netnode so that it can be restored when the
+    database is opened again.
+
+    The index is kept up-to-date as functions and their instructions are
+    modified, and can be used to calculate the transitive closure of a
+    function's callees or callers without having to re-scan any code.
+    When called, this namespace will return an `interface.digraph_t` of
+    the entire call graph.
+
+    Some ways of using this namespace are::
+
+        > G = database.callgraph()
+        > for ea in database.callgraph.down(ea): ...
+        > callers = database.callgraph.up(ea)
+        > for caller, site in database.callgraph.sites(ea): ...
+        > res = database.callgraph.reachable(ea, depth=3)
+
+    """
+    __node__, __version__ = '$ callgraph', 2
+    __loaded__, __dirty__, __graph__ = False, False, None
+    __calls__, __callers__, __stale__ = {}, {}, builtins.set()
+
+    marshaller = __import__('marshal')
+    codec = __import__('codecs').lookup('bz2_codec')
+
+    def __new__(cls):
+        '''Return an `interface.digraph_t` of every call made between the functions in the database.'''
+        cls.__refresh__()
+        if cls.__graph__ is not None:
+            return cls.__graph__
+
+        # the graph is kept until the index is modified so that it can be shared between queries
+        nodes = sorted(builtins.set(cls.__calls__).union(cls.__callers__))
+        index = {ea : i for i, ea in enumerate(nodes)}
+
+        # lay out the callees of each node in compressed-sparse-row form
+        offset, edges = array.array('L', [0]), array.array('L')
+        for ea in nodes:
+            edges.extend(sorted({index[target] for _, target in cls.__calls__.get(ea, ())}))
+            offset.append(len(edges))
+        cls.__graph__ = res = interface.digraph_t(nodes, offset, edges, attributes=lambda i: {'__name__': name(nodes[i]), '__address__': nodes[i]})
+        return res
+
+    @classmethod
+    def __scan__(cls, fn):
+        '''Return a list of each ``(site, target)`` for the calls made by the function ``fn``.'''
+        res, getflags = [], idaapi.getFlags if idaapi.__version__ < 7.0 else idaapi.get_flags
+        for left, right in function.chunks(fn):
+            for ea in address.iterate(left, right):
+                if getflags(ea) & idaapi.MS_CLS != idaapi.FF_CODE:
+                    continue
+
+                # collect each code reference that leaves the function, or recurses back into it
+                targets = builtins.list(interface.xiterate(ea, idaapi.get_first_fcref_from, idaapi.get_next_fcref_from))
+                for target in targets:
+                    owner = idaapi.get_func(target)
+                    if target == fn.startEA or owner is None or owner.startEA != fn.startEA:
+                        res.append((ea, target))
+                    continue
+
+                # a call through an import or some other pointer only references data, so use that as its target
+                if not targets:
+                    drefs = builtins.list(interface.xiterate(ea, idaapi.get_first_dref_from, idaapi.get_next_dref_from))
+                    if drefs and _instruction.is_call(ea):
+                        res.extend((ea, target) for target in drefs)
+                    continue
+                continue
+            continue
+        return res
+
+    @classmethod
+    def __store__(cls, caller, calls):
+        cls.__calls__[caller] = calls
+        for site, target in calls:
+            cls.__callers__.setdefault(target, builtins.set()).add((caller, site))
+        cls.__dirty__, cls.__graph__ = True, None
+
+    @classmethod
+    def __discard__(cls, caller):
+        for site, target in cls.__calls__.pop(caller, ()):
+            res = cls.__callers__.get(target, builtins.set())
+            res.discard((caller, site))
+            if not res: cls.__callers__.pop(target, None)
+        cls.__dirty__, cls.__graph__ = True, None
+
+    @classmethod
+    def __refresh__(cls):
+        '''Ensure the index is loaded and re-scan any functions that have been modified since it was last queried.'''
+        if not cls.__loaded__:
+            cls.load() or cls.build()
+
+        # an address that was marked might be an entrypoint that no longer exists, or one inside a function
+        while cls.__stale__:
+            ea = cls.__stale__.pop()
+            cls.__discard__(ea)
+            fn = idaapi.get_func(ea)
+            if fn:
+                cls.__discard__(fn.startEA)
+                cls.__store__(fn.startEA, cls.__scan__(fn))
+            continue
+        return
+
+    @classmethod
+    def __invalidate__(cls, start, end=None):
+        '''Mark the function at ``start``, or every function with a chunk between ``start`` and ``end``, as needing to be re-scanned.'''
+        if end is None:
+            cls.__stale__.add(start)
+            return
+
+        ch = idaapi.get_fchunk(start) or idaapi.get_next_fchunk(start)
+        while ch and ch.startEA < end:
+            fn = idaapi.get_func(ch.startEA)
+            fn and cls.__stale__.add(fn.startEA)
+            ch = idaapi.get_next_fchunk(ch.startEA)
+        return
+
+    @classmethod
+    def __sites__(cls, start, end):
+        '''Mark every function with a call site between ``start`` and ``end`` as needing to be re-scanned.'''
+        res = [caller for caller, calls in six.iteritems(cls.__calls__) if any(start <= site < end for site, _ in calls)]
+        cls.__stale__.update(res)
+
+    @classmethod
+    def __reset__(cls):
+        '''Discard the index that is in memory so that it will be restored or re-built when it is next queried.'''
+        cls.__loaded__, cls.__dirty__, cls.__graph__ = False, False, None
+        cls.__calls__, cls.__callers__ = {}, {}
+        cls.__stale__.clear()
+
+    @classmethod
+    def __rebase__(cls, info):
+        '''Discard the index and the copy in its netnode since every address in it has been moved.'''
+        cls.__reset__()
+        internal.netnode.blob.remove(cls.node(), idaapi.stag)
+
+    @classmethod
+    def __savebase__(cls, *args):
+        '''Write the index into its netnode if it has been modified.'''
+
+        # if any functions were modified, then the stored index needs to be
+        # restored and brought up to date even if it was never queried.
+        if cls.__stale__ and (cls.__loaded__ or cls.load()):
+            cls.__refresh__()
+
+        if cls.__loaded__ and cls.__dirty__:
+            cls.save()
+        return
+
+    @classmethod
+    def node(cls):
+        '''Return the id of the netnode that the index is stored in.'''
+        res = internal.netnode.get(cls.__node__)
+        return internal.netnode.new(cls.__node__) if res == idaapi.BADADDR else res
+
+    @classmethod
+    def build(cls):
+        '''Build the index by scanning the calls made by every function in the database.'''
+        cls.__calls__, cls.__callers__, cls.__loaded__, cls.__graph__ = {}, {}, True, None
+
+        p, funcs = ui.Progress(), functions()
+        p.update(current=0, min=0, max=len(funcs), title="Building call graph...")
+        p.open()
+        try:
+            for i, ea in enumerate(funcs):
+                if p.canceled:
+                    logging.warn("{:s}.build() : Building of the call graph was cancelled after {:d} of {:d} function{:s}. The remaining functions will be scanned when the index is next queried.".format('.'.join((__name__, cls.__name__)), i, len(funcs), '' if len(funcs) == 1 else 's'))
+                    cls.__stale__.update(funcs[i:])
+                    break
+                p.update(current=i, text="Scanning function {:#x} -> {:d} of {:d}".format(ea, i + 1, len(funcs)))
+                cls.__store__(ea, cls.__scan__(idaapi.get_func(ea)))
+        finally:
+            p.close()
+        cls.__stale__.difference_update(cls.__calls__)
+        return len(cls.__calls__)
+
+    @classmethod
+    def load(cls):
+        '''Restore the index from its netnode. Return false if it has not been stored or its version is different.'''
+        encdata = internal.netnode.blob.get(cls.node(), idaapi.stag)
+        if encdata is None:
+            return False
+
+        try:
+            data, _ = cls.codec.decode(encdata)
+            version, calls = cls.marshaller.loads(data)
+        except (ValueError, EOFError, TypeError, IOError):
+            logging.warn("{:s}.load() : Unable to decode the call graph that was stored in netnode {!r}. It will need to be re-built.".format('.'.join((__name__, cls.__name__)), cls.__node__))
+            return False
+
+        if version != cls.__version__:
+            logging.info("{:s}.load() : The call graph stored in netnode {!r} is version {!r} instead of {!r}. It will need to be re-built.".format('.'.join((__name__, cls.__name__)), cls.__node__, version, cls.__version__))
+            return False
+
+        cls.__calls__, cls.__callers__, cls.__loaded__, cls.__graph__ = {}, {}, True, None
+        [ cls.__store__(caller, items) for caller, items in six.iteritems(calls) ]
+        cls.__dirty__ = False
+        return True
+
+    @classmethod
+    def save(cls):
+        '''Store the index within its netnode along with its version.'''
+        data = cls.marshaller.dumps((cls.__version__, cls.__calls__))
+        encdata, _ = cls.codec.encode(data)
+        ok = internal.netnode.blob.set(cls.node(), idaapi.stag, encdata)
+        if not ok:
+            raise IOError("{:s}.save() : Unable to store the call graph in netnode {!r}.".format('.'.join((__name__, cls.__name__)), cls.__node__))
+        cls.__dirty__ = False
+        return True
+
+    @utils.multicase()
+    @classmethod
+    def update(cls):
+        '''Re-scan the calls made by the current function.'''
+        return cls.update(ui.current.function())
+    @utils.multicase()
+    @classmethod
+    def update(cls, func):
+        '''Re-scan the calls made by the function ``func``.'''
+        fn = function.by(func)
+        cls.__stale__.add(fn.startEA)
+        cls.__refresh__()
+        return cls.__calls__.get(fn.startEA, [])[:]
+
+    @utils.multicase()
+    @classmethod
+    def calls(cls):
+        '''Return each ``(site, target)`` for the calls made by the current function.'''
+        return cls.calls(ui.current.function())
+    @utils.multicase()
+    @classmethod
+    def calls(cls, func):
+        '''Return each ``(site, target)`` for the calls made by the function ``func``.'''
+        fn = function.by(func)
+        cls.__refresh__()
+        return cls.__calls__.get(fn.startEA, [])[:]
+
+    @utils.multicase()
+    @classmethod
+    def sites(cls):
+        '''Return each ``(caller, site)`` that calls the current function.'''
+        return cls.sites(ui.current.function())
+    @utils.multicase()
+    @classmethod
+    def sites(cls, func):
+        '''Return each ``(caller, site)`` that calls the function ``func``.'''
+        rt, ea = interface.addressOfRuntimeOrStatic(func)
+        cls.__refresh__()
+        return sorted(cls.__callers__.get(ea, ()))
+
+    @utils.multicase()
+    @classmethod
+    def down(cls):
+        '''Return each address that is called by the current function.'''
+        return cls.down(ui.current.function())
+    @utils.multicase()
+    @classmethod
+    def down(cls, func):
+        '''Return each address that is called by the function ``func``.'''
+        return sorted({target for _, target in cls.calls(func)})
+
+    @utils.multicase()
+    @classmethod
+    def up(cls):
+        '''Return each function that calls the current function.'''
+        return cls.up(ui.current.function())
+    @utils.multicase()
+    @classmethod
+    def up(cls, func):
+        '''Return each function that calls the function ``func``.'''
+        return sorted({caller for caller, _ in cls.sites(func)})
+
+    @utils.multicase()
+    @classmethod
+    def reachable(cls, **options):
+        '''Return each address that is transitively called by the current function.'''
+        return cls.reachable(ui.current.function(), **options)
+    @utils.multicase()
+    @classmethod
+    def reachable(cls, func, **options):
+        """Return each address that is transitively called by the function ``func``.
+
+        If ``reverse`` is true, then return each function that transitively calls ``func`` instead.
+        If ``depth`` is specified, then only follow calls up to the given depth.
+        """
+        rt, ea = interface.addressOfRuntimeOrStatic(func)
+        cls.__refresh__()
+
+        reverse, depth = options.get('reverse', False), options.get('depth', None)
+        if reverse:
+            adjacent = lambda ea: (caller for caller, _ in cls.__callers__.get(ea, ()))
+        else:
+            adjacent = lambda ea: (target for _, target in cls.__calls__.get(ea, ()))
+
+        # walk breadth-first so that we can stop at the requested depth
+        res, queue, level = builtins.set(), [ea], 0
+        while queue and (depth is None or level < depth):
+            items = []
+            for item in itertools.chain(*map(adjacent, queue)):
+                if item not in res:
+                    res.add(item)
+                    items.append(item)
+                continue
+            queue, level = items, level + 1
+        return sorted(res)
+
 # create/erase a mark at the specified address in the .idb
 class marks(object):
     """
@@ -3320,6 +4214,7 @@ class marks(object):
             res, idx = None, cls.__free_slotindex()
             logging.info("{:s}.new({:#x}, ...) : Creating mark {:d} at {:#x} with the description {!r}.".format('.'.join((__name__, cls.__name__)), ea, idx, ea, description))
         cls.__set_description(idx, ea, description, **extra)
+        cls.__invalidate__()
         return res
 
     @utils.multicase()
@@ -3335,24 +4230,77 @@ class marks(object):
         idx = cls.__find_slotaddress(ea)
         descr = cls.__get_description(idx)
         cls.__set_description(idx, ea, '')
+        cls.__invalidate__()
         logging.warn("{:s}.remove({:#x}) : Removed mark {:d} at {:#x} with the description {!r}.".format('.'.join((__name__, cls.__name__)), ea, idx, ea, descr))
         return descr
 
+    # the table of marks
+    __cache__ = None
+
     @classmethod
-    def iterate(cls):
-        '''Iterate through all of the marks in the database.'''
-        count = 0
+    def __invalidate__(cls, *args):
+        '''Discard the table of marks.'''
+        cls.__cache__ = None
+
+    @classmethod
+    def __table__(cls):
+        """Return the table of marks for the database.
+
+        The table is a tuple composed of the ``(address, description)`` of each mark
+        ordered by its slot, the sorted addresses of the marks, their slots in the
+        same order, and a dictionary of each address to its slot.
+        """
+        if cls.__cache__ is not None:
+            res, addresses, slots, byaddress = cls.__cache__
+
+            # marks are discarded by the bookmark_changed event when IDA has it. if it
+            # doesn't, then check that the next slot is still free and that the last slot
+            # hasn't moved in case a mark was created or removed without us knowing.
+            try: cls.__get_slotaddress(len(res))
+            except KeyError:
+                try:
+                    if not res or cls.__get_slotaddress(len(res) - 1) == res[-1][0]:
+                        return cls.__cache__
+                except KeyError: pass
+
+        res = []
         try:
             for idx in six.moves.range(cls.MAX_SLOT_COUNT):
-                yield cls.by_index(idx)
+                res.append(cls.by_index(idx))
         except KeyError:
             pass
+
+        slots = sorted(six.moves.range(len(res)), key=lambda idx: res[idx][0])
+        addresses = [res[idx][0] for idx in slots]
+        byaddress = {}
+        for idx, (ea, _) in enumerate(res):
+            byaddress.setdefault(ea, idx)
+        cls.__cache__ = res, addresses, slots, byaddress
+        return cls.__cache__
+
+    @utils.multicase()
+    @classmethod
+    def iterate(cls):
+        '''Iterate through all of the marks in the database.'''
+        res, _, _, _ = cls.__table__()
+        for ea, comment in res[:]:
+            yield ea, comment
+        return
+    @utils.multicase(start=six.integer_types, end=six.integer_types)
+    @classmethod
+    def iterate(cls, start, end):
+        '''Iterate through all of the marks from the address ``start`` to ``end`` in order of their address.'''
+        res, addresses, slots, _ = cls.__table__()
+        left, right = bisect.bisect_left(addresses, start), bisect.bisect_left(addresses, end)
+        for idx in slots[left : right]:
+            yield res[idx]
         return
 
     @classmethod
     def length(cls):
         '''Return the number of marks in the database.'''
-        return len(builtins.list(cls.iterate()))
+        res, _, _, _ = cls.__table__()
+        return len(res)
 
     @classmethod
     def by_index(cls, index):
@@ -3371,9 +4319,18 @@ class marks(object):
     @classmethod
     def by_address(cls, ea):
         '''Return the ``(address, description)`` of the mark at the given address ``ea``.'''
-        return cls.by_index(cls.__find_slotaddress(ea))
+        res, _, _, _ = cls.__table__()
+        return res[cls.__find_slotaddress(ea)]
     by = byAddress = utils.alias(by_address, 'marks')
 
+    @classmethod
+    def __find_slotaddress(cls, ea):
+        '''Return the index of the mark at the specified address ``ea``.'''
+        _, _, _, byaddress = cls.__table__()
+        if ea not in byaddress:
+            raise KeyError("{:s}.find_slotaddress({:#x}) : Unable to find specified slot address.".format('.'.join((__name__, cls.__name__)), ea))
+        return byaddress[ea]
+
     ## Internal functions depending on which version of IDA is being used (<7.0)
     if idaapi.__version__ < 7.0:
         @classmethod
@@ -3397,21 +4354,6 @@ class marks(object):
             '''Return the description of the mark at the specified ``index``.'''
             return cls.__location().markdesc(index)
 
-        @classmethod
-        def __find_slotaddress(cls, ea):
-            '''Return the index of the mark at the specified address ``ea``.'''
-            # FIXME: figure out how to fail if this address isn't found
-            res = itertools.islice(itertools.count(), cls.MAX_SLOT_COUNT)
-            res, iterable = itertools.tee(itertools.imap(cls.__get_slotaddress, res))
-            try:
-                count = len(builtins.list(itertools.takewhile(lambda n: n != ea, res)))
-            except IndexError:
-                raise KeyError("{:s}.find_slotaddress({:#x}) : Unable to find specified slot address.".format('.'.join((__name__, cls.__name__)), ea))
-            builtins.list(itertools.islice(iterable, count))
-            if builtins.next(iterable) != ea:
-                raise KeyError("{:s}.find_slotaddress({:#x}) : Unable to find specified slot address.".format('.'.join((__name__, cls.__name__)), ea))
-            return count
-
         @classmethod
         def __free_slotindex(cls):
             '''Return the index of the next available mark slot.'''
@@ -3442,20 +4384,6 @@ class marks(object):
             '''Return the description of the mark at the specified ``index``.'''
             return idaapi.get_mark_comment(index)
 
-        @classmethod
-        def __find_slotaddress(cls, ea):
-            '''Return the index of the mark at the specified address ``ea``.'''
-            res = itertools.islice(itertools.count(), cls.MAX_SLOT_COUNT)
-            res, iterable = itertools.tee(itertools.imap(cls.__get_slotaddress, res))
-            try:
-                count = len(builtins.list(itertools.takewhile(lambda n: n != ea, res)))
-            except IndexError:
-                raise KeyError("{:s}.find_slotaddress({:#x}) : Unable to find specified slot address.".format('.'.join((__name__, cls.__name__)), ea))
-            builtins.list(itertools.islice(iterable, count))
-            if builtins.next(iterable) != ea:
-                raise KeyError("{:s}.find_slotaddress({:#x}) : Unable to find specified slot address.".format('.'.join((__name__, cls.__name__)), ea))
-            return count
-
         @classmethod
         def __free_slotindex(cls):
             '''Return the index of the next available mark slot.'''
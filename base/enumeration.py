@@ -116,12 +116,18 @@ def search(**type):
 
 def names(enum):
     '''Return a list of all the names belonging to the enumeration ``enum``.'''
-    return [member.name(n) for n in members.iterate(enum)]
+    order, _, _ = members.__table__(by(enum))
+    return [name for _, name, _ in order]
 keys = utils.alias(names)
 
 def values(enum):
     '''Return a list of all the values belonging to the enumeration ``enum``.'''
-    return [member.value(n) for n in members.iterate(enum)]
+    order, _, _ = members.__table__(by(enum))
+    return [value for _, _, value in order]
+
+def constants():
+    '''Return a dictionary of each value in every enumeration to a list of its ``(enum, name)``.'''
+    return members.constants()
 
 ## creation/deletion
 def new(name, flags=0):
@@ -295,32 +301,84 @@ class members(object):
         return member.remove(mid)
     delete = destroy = utils.alias(remove, 'members')
 
+    ## lookup tables
+    __cache__, __constants__ = {}, None
+
+    @classmethod
+    def __invalidate__(cls, eid=None):
+        '''Discard the lookup tables for the enumeration ``eid``, or every enumeration if it is not specified.'''
+        cls.__constants__ = None
+        if eid is None:
+            return cls.__cache__.clear()
+        cls.__cache__.pop(eid, None)
+
+    @classmethod
+    def __table__(cls, eid):
+        """Return the lookup tables for the members of the enumeration ``eid``.
+
+        This is a tuple containing the list of ``(id, name, value)`` for each member ordered
+        by their index, a dictionary of each name to its id, and a dictionary of each value
+        to its ids.
+        """
+        if eid in cls.__cache__:
+            return cls.__cache__[eid]
+
+        # walk through all the members once and collect their names and values
+        order, names, values = [], {}, {}
+        for mid in cls.iterate(eid):
+            name, value = member.name(mid), member.value(mid)
+            order.append((mid, name, value))
+            names.setdefault(name, mid)
+            values.setdefault(value, []).append(mid)
+        res = cls.__cache__[eid] = order, names, values
+        return res
+
+    @classmethod
+    def constants(cls):
+        '''Return a dictionary of each value in every enumeration to a list of its ``(enum, name)``.'''
+        if cls.__constants__ is not None:
+            return cls.__constants__
+
+        res = {}
+        for eid in __iterate__():
+            order, _, _ = cls.__table__(eid)
+            for _, name, value in order:
+                res.setdefault(value, []).append((eid, name))
+            continue
+        cls.__constants__ = res
+        return res
+
     ## aggregations
     @classmethod
     def names(cls, enum):
         '''Return a set of all the names belonging to the enumeration ``enum``.'''
         eid = by(enum)
-        return { member.name(mid) for mid in cls.iterate(eid) }
+        _, names, _ = cls.__table__(eid)
+        return { name for name in names }
 
     @classmethod
     def values(cls, enum):
         '''Return a set of all the values belonging to the enumeration ``enum``.'''
         eid = by(enum)
-        return { member.value(mid) for mid in cls.iterate(eid) }
+        _, _, values = cls.__table__(eid)
+        return { value for value in values }
 
     @classmethod
     def mapping(cls, enum):
         '''Return a dictionary mapping all the values values to their names for the enumeration ``enum``.'''
         eid = by(enum)
-        return { member.value(mid) : member.name(mid) for mid in cls.iterate(eid) }
+        order, _, _ = cls.__table__(eid)
+        return { value : name for _, name, value in order }
 
     ## searching
     @classmethod
     def by_index(cls, enum, index):
         '''Return the member identifier for the member of the enumeration ``enum`` at the specified ``index``.'''
         eid = by(enum)
-        try: return next(mid for i, mid in enumerate(cls.iterate(eid)) if i == index)
-        except StopIteration: pass
+        order, _, _ = cls.__table__(eid)
+        if 0 <= index < len(order):
+            mid, _, _ = order[index]
+            return mid
         raise LookupError("{:s}.by_index({:#x}, {:d}) : Unable to locate member by index.".format('.'.join((__name__, cls.__name__)), eid, index))
 
     @classmethod
@@ -346,11 +404,8 @@ class members(object):
     def by_name(cls, enum, name):
         '''Return the member identifier for the member of the enumeration ``enum`` with the specified ``name``.'''
         eid = by(enum)
-        for mid in cls.iterate(eid):
-            if name == member.name(mid):
-                return mid
-            continue
-        return
+        _, names, _ = cls.__table__(eid)
+        return names.get(name, None)
     byName = utils.alias(by_name, 'members')
 
     @utils.multicase(n=six.integer_types)
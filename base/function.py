@@ -22,7 +22,7 @@ import six
 from six.moves import builtins
 
 import functools, operator, itertools, types
-import logging
+import logging, collections, bisect
 
 import database, instruction, structure
 import ui, internal
@@ -298,16 +298,10 @@ def marks():
 @utils.multicase()
 def marks(func):
     '''Return all the marks in the function ``func``.'''
-    funcea = address(func)
     result = []
-    for ea, comment in database.marks():
-        try:
-            if address(ea) == funcea:
-                result.append( (ea, comment) )
-        except Exception:
-            pass
-        continue
-    return result
+    for start, end in chunks(func):
+        result.extend(database.marks.iterate(start, end))
+    return sorted(result)
 
 ## functions
 @utils.multicase()
@@ -348,6 +342,7 @@ class chunks(object):
 
         > for l, r in function.chunks(): ...
         > for ea in function.chunks.iterate(ea): ...
+        > ea = function.chunks.owner(ea)
 
     """
     @utils.multicase()
@@ -368,6 +363,98 @@ class chunks(object):
             if not fci.next(): break
         return
 
+    # interval index of every chunk in the database sorted by its address
+    __start__, __stop__, __owner__, __shared__ = [], [], [], set()
+    __valid__ = False
+
+    @classmethod
+    def __build__(cls):
+        '''Build the interval index from every function chunk in the database.'''
+        start, stop, owner, shared = [], [], [], set()
+        left, right = database.config.bounds()
+        ch = idaapi.get_fchunk(left) or idaapi.get_next_fchunk(left)
+        while ch and ch.startEA < right:
+            tailQ = ch.flags & idaapi.FUNC_TAIL != 0
+            start.append(ch.startEA), stop.append(ch.endEA), owner.append(ch.owner if tailQ else ch.startEA)
+            if tailQ and ch.refqty > 1: shared.add(ch.startEA)
+            ch = idaapi.get_next_fchunk(ch.startEA)
+        cls.__start__, cls.__stop__, cls.__owner__, cls.__shared__ = start, stop, owner, shared
+        cls.__valid__ = True
+
+    @classmethod
+    def __invalidate__(cls):
+        '''Discard the interval index so that it is re-built the next time it is needed.'''
+        cls.__start__, cls.__stop__, cls.__owner__, cls.__valid__ = [], [], [], False
+        cls.__shared__.clear()
+
+    @classmethod
+    def __find__(cls, ea):
+        '''Return the position of the chunk containing the address ``ea`` within the interval index, or ``None`` if there isn't one.'''
+        if not cls.__valid__:
+            cls.__build__()
+        index = bisect.bisect_right(cls.__start__, ea) - 1
+        return index if index >= 0 and ea < cls.__stop__[index] else None
+
+    @classmethod
+    def __insert__(cls, left, right, owner):
+        '''Add the chunk ``left`` to ``right`` for the function at ``owner`` to the interval index.'''
+        if not cls.__valid__: return
+        index = bisect.bisect_left(cls.__start__, left)
+        if index < len(cls.__start__) and cls.__start__[index] == left:
+            cls.__stop__[index] = right
+            if cls.__owner__[index] != owner: cls.__shared__.add(left)
+            return
+        cls.__start__.insert(index, left), cls.__stop__.insert(index, right), cls.__owner__.insert(index, owner)
+
+    @classmethod
+    def __remove__(cls, left):
+        '''Remove the chunk starting at ``left`` from the interval index.'''
+        if not cls.__valid__: return
+
+        # if the chunk is shared, then we don't know who will own it afterwards
+        if left in cls.__shared__:
+            return cls.__invalidate__()
+
+        index = bisect.bisect_left(cls.__start__, left)
+        if index < len(cls.__start__) and cls.__start__[index] == left:
+            del(cls.__start__[index], cls.__stop__[index], cls.__owner__[index])
+        return
+
+    @classmethod
+    def __resize__(cls, left, start, stop):
+        '''Change the bounds of the chunk at ``left`` to ``start`` and ``stop``, moving any tails of an entry chunk to the new entrypoint.'''
+        if not cls.__valid__: return
+        index = bisect.bisect_left(cls.__start__, left)
+        if index >= len(cls.__start__) or cls.__start__[index] != left:
+            return
+        owner = cls.__owner__[index]
+        del(cls.__start__[index], cls.__stop__[index], cls.__owner__[index])
+
+        # a tail keeps its owner, but if it's shared then its new start is too
+        if owner != left:
+            if left in cls.__shared__:
+                cls.__shared__.discard(left), cls.__shared__.add(start)
+            return cls.__insert__(start, stop, owner)
+
+        if left != start:
+            cls.__owner__[:] = [start if owner == left else owner for owner in cls.__owner__]
+        cls.__insert__(start, stop, start)
+
+    @classmethod
+    def __reassign__(cls, left, owner):
+        '''Change the owner of the tail chunk at ``left`` to the function at ``owner``.'''
+        if not cls.__valid__: return
+        index = bisect.bisect_left(cls.__start__, left)
+        if index < len(cls.__start__) and cls.__start__[index] == left:
+            cls.__owner__[index] = owner
+        return
+
+    @classmethod
+    def owner(cls, ea):
+        '''Return the entrypoint of the function that owns the chunk containing the address ``ea``, or ``None`` if there isn't one.'''
+        index = cls.__find__(ea)
+        return None if index is None else cls.__owner__[index]
+
     @utils.multicase()
     @classmethod
     def iterate(cls):
@@ -545,7 +632,7 @@ def within():
 def within(ea):
     '''Return true if the address ``ea`` is within a function.'''
     ea = interface.address.within(ea)
-    return idaapi.get_func(ea) is not None
+    return chunks.owner(ea) is not None
 
 # Checks if ea is contained in function or in any of its chunks
 @utils.multicase()
@@ -559,11 +646,24 @@ def contains(ea):
 @utils.multicase(ea=six.integer_types)
 def contains(func, ea):
     '''Returns True if the address ``ea`` is contained by the function ``func``.'''
-    try: fn = by(func)
-    except LookupError:
-        return False
     ea = interface.address.within(ea)
-    return any(start <= ea < end for start, end in chunks(fn))
+    if isinstance(func, idaapi.func_t):
+        target = func.owner if func.flags & idaapi.FUNC_TAIL else func.startEA
+    elif isinstance(func, six.integer_types):
+        target = chunks.owner(func)
+    else:
+        try: target = by(func).startEA
+        except LookupError: return False
+
+    # use the interval index, unless the chunk is a tail that is shared by more than one function
+    index = chunks.__find__(ea)
+    if target is None or index is None:
+        return False
+    elif chunks.__owner__[index] == target:
+        return True
+    elif chunks.__start__[index] not in chunks.__shared__:
+        return False
+    return idaapi.func_contains(idaapi.get_func(target), ea)
 
 class blocks(object):
     """
@@ -573,8 +673,9 @@ class blocks(object):
 
     This namespace provides a small number of utilities that can be
     used to extract the basic blocks of a function and convert them
-    into a flow-graph such as `idaapi.FlowChart`, or a digraph as used
-    by the `networkx` module.
+    into a flow-graph such as `idaapi.FlowChart`, an `interface.digraph_t`
+    for analyzing the control-flow, or a digraph as used by the `networkx`
+    module.
 
     Due to `idaapi.FlowChart` and networkx's digraph being used so
     often, these functions are exported globally as `function.flowchart`
@@ -584,6 +685,7 @@ class blocks(object):
 
         > for bb in function.blocks(): ...
         > chart = function.blocks.flowchart(ea)
+        > cfg = function.blocks.cfg(ea)
         > G = function.blocks.graph()
 
     """
@@ -617,12 +719,45 @@ class blocks(object):
     @classmethod
     def iterate(cls, func):
         '''Returns each `idaapi.BasicBlock` for the function ``func``.'''
-        fn = by(func)
-        fc = idaapi.FlowChart(f=fn, flags=idaapi.FC_PREDS)
-        for bb in fc:
+        model = cls.model(func)
+        for bb in model.blocks:
             yield bb
         return
 
+    # cache of the block model for each function keyed by its entrypoint
+    __cache__, __maximum__ = collections.OrderedDict(), 0x100
+
+    @utils.multicase()
+    @classmethod
+    def model(cls):
+        '''Return the `interface.blockmodel_t` for the current function.'''
+        return cls.model(ui.current.function())
+    @utils.multicase()
+    @classmethod
+    def model(cls, func):
+        """Return the `interface.blockmodel_t` for the function ``func``.
+
+        The model is built once and then cached until the function or its contents are modified.
+        """
+        fn = by(func)
+        res = cls.__cache__.pop(fn.startEA, None)
+        if res is None:
+            res = interface.blockmodel_t(idaapi.FlowChart(f=fn, flags=idaapi.FC_PREDS))
+            while len(cls.__cache__) >= cls.__maximum__:
+                cls.__cache__.popitem(last=False)
+        cls.__cache__[fn.startEA] = res
+        return res
+
+    @classmethod
+    def __invalidate__(cls, start, end=None):
+        '''Discard the block model of the function at ``start``, or any that overlap the addresses ``start`` to ``end``.'''
+        if end is None:
+            return cls.__cache__.pop(start, None) is not None
+        res = [ea for ea, model in six.iteritems(cls.__cache__) if model.overlaps(start, end)]
+        for ea in res:
+            del(cls.__cache__[ea])
+        return len(res) > 0
+
     @utils.multicase()
     @classmethod
     def at(cls):
@@ -639,10 +774,9 @@ class blocks(object):
     def at(cls, func, ea):
         '''Return the `idaapi.BasicBlock` in function ``func`` at address ``ea``.'''
         fn = by(func)
-        for bb in blocks.iterate(fn):
-            if bb.startEA <= ea < bb.endEA:
-                return bb
-            continue
+        res = cls.model(fn).at(ea)
+        if res is not None:
+            return res
         raise LookupError("{:s}.at({:#x}, {:#x}) : Unable to locate idaapi.BasicBlock for function {:#x}.".format('.'.join((__name__, cls.__name__)), address(fn), ea, address(fn)))
 
     @utils.multicase()
@@ -657,6 +791,36 @@ class blocks(object):
         fn = by(func)
         return idaapi.FlowChart(f=fn, flags=idaapi.FC_PREDS)
 
+    @utils.multicase()
+    @classmethod
+    def cfg(cls):
+        '''Return an `interface.digraph_t` of the basic blocks for the current function.'''
+        return cls.cfg(ui.current.function())
+    @utils.multicase()
+    @classmethod
+    def cfg(cls, func):
+        """Return an `interface.digraph_t` of the basic blocks for the function ``func``.
+
+        Each node is the address of a basic block and is indexed by the block's id. The
+        attributes for a node are only fetched from the database when they are requested.
+        """
+        fn = by(func)
+        model = cls.model(fn)
+
+        # fetch the attributes for the specified block id
+        def attributes(index):
+            bb = model.blocks[index]
+            res = database.tag(bb.startEA)
+            operator.setitem(res, '__name__', name(bb.startEA) if bb.startEA == fn.startEA else database.name(bb.startEA))
+            operator.setitem(res, '__address__', bb.startEA)
+            operator.setitem(res, '__bounds__', interface.bounds_t(bb.startEA, bb.endEA))
+            color = block.color(bb)
+            if color is not None: operator.setitem(res, '__color__', color)
+            return res
+
+        nodes = [bb.startEA for bb in model.blocks]
+        return interface.digraph_t(nodes, model.succ_offset, model.succ, entry=model.index(fn.startEA), attributes=attributes)
+
     @utils.multicase()
     @classmethod
     def digraph(cls):
@@ -670,49 +834,19 @@ class blocks(object):
         Requires the `networkx` module in order to build the graph.
         """
         fn = by(func)
+        graph, model = cls.cfg(fn), cls.model(fn)
 
         # create digraph
-        import networkx
         attrs = tag(fn.startEA)
         attrs.setdefault('__name__', database.name(fn.startEA))
         attrs.setdefault('__address__', fn.startEA)
         attrs.setdefault('__frame__', frame(fn))
-        res = networkx.DiGraph(name=name(fn.startEA), **attrs)
-
-        # create entry node
-        attrs = database.tag(fn.startEA)
-        operator.setitem(attrs, '__name__', name(fn.startEA))
-        operator.setitem(attrs, '__address__', fn.startEA)
-        operator.setitem(attrs, '__bounds__', block(fn.startEA))
-        block.color(fn.startEA) and operator.setitem(attrs, '__color__', block.color(fn.startEA))
-        res.add_node(fn.startEA, attrs)
-
-        # create a graph node for each basicblock
-        for b, e in cls(fn):
-            if b == fn.startEA: continue
-            attrs = database.tag(b)
-            operator.setitem(attrs, '__name__', database.name(b))
-            operator.setitem(attrs, '__address__', b)
-            operator.setitem(attrs, '__bounds__', (b, e))
-            block.color(b) and operator.setitem(attrs, '__color__', block.color(b))
-            res.add_node(b, attrs)
-
-        # for every single block...
-        for b in cls.iterate(fn):
-            # ...add an edge to its predecessors
-            for p in b.preds():
-                # FIXME: figure out more attributes to add
-                attrs = {}
-                operator.setitem(attrs, '__contiguous__', b.startEA == p.endEA)
-                res.add_edge(p.startEA, b.startEA, attrs)
-
-            # ...add an edge to its successors
-            for s in b.succs():
-                # FIXME: figure out more attributes to add
-                attrs = {}
-                operator.setitem(attrs, '__contiguous__', b.endEA == s.startEA)
-                res.add_edge(b.startEA, s.startEA, attrs)
-            continue
+        res = graph.networkx(name=name(fn.startEA), **attrs)
+
+        # now we can tag each edge with whether it's contiguous
+        for source, target in graph.edges():
+            # FIXME: figure out more attributes to add
+            res[graph.nodes[source]][graph.nodes[target]]['__contiguous__'] = model.blocks[source].endEA == model.blocks[target].startEA
         return res
     graph = utils.alias(digraph, 'blocks')
 
@@ -1184,6 +1318,7 @@ class frame(object):
         > print function.frame()
         > print hex(function.frame.id(ea))
         > sp = function.frame.delta(ea)
+        > for (offset, size), (name, _, _) in function.frame.layout(ea): ...
 
     """
     @utils.multicase()
@@ -1213,6 +1348,73 @@ class frame(object):
         fn = by(func)
         return fn.frame
 
+    # cache of the layout for each frame keyed by its structure id
+    __cache__, __maximum__ = collections.OrderedDict(), 0x400
+
+    @classmethod
+    def __layout__(cls, id):
+        '''Return the offset of each member and the layout for the frame identified by ``id``.'''
+        res = cls.__cache__.pop(id, None)
+        if res is None:
+            layout = tuple(structure.members(id))
+            res = [offset for (offset, _), _ in layout], layout
+            while len(cls.__cache__) >= cls.__maximum__:
+                cls.__cache__.popitem(last=False)
+        cls.__cache__[id] = res
+        return res
+
+    @classmethod
+    def __invalidate__(cls, id=None):
+        '''Discard the layout of the frame identified by ``id``, or every frame if it is not specified.'''
+        if id is None:
+            return cls.__cache__.clear()
+        cls.__cache__.pop(id, None)
+
+    @utils.multicase()
+    @classmethod
+    def layout(cls):
+        '''Return the layout of the current function's frame.'''
+        return cls.layout(ui.current.function())
+    @utils.multicase()
+    @classmethod
+    def layout(cls, func):
+        """Return the layout of the frame for the function ``func``.
+
+        The layout is a tuple in the same format as `structure.members` and is cached until the frame is modified.
+        """
+        fn = by(func)
+        if fn.frame == idaapi.BADADDR:
+            return ()
+        _, res = cls.__layout__(fn.frame)
+        return res
+
+    @utils.multicase(offset=six.integer_types, size=six.integer_types)
+    @classmethod
+    def fragment(cls, offset, size):
+        '''Yield each member of the current function's frame from the ``offset`` up to the ``size``.'''
+        return cls.fragment(ui.current.function(), offset, size)
+    @utils.multicase(offset=six.integer_types, size=six.integer_types)
+    @classmethod
+    def fragment(cls, func, offset, size):
+        """Yield each member of the frame for the function ``func`` from the ``offset`` up to the ``size``.
+
+        Each member is yielded in the same format as `structure.fragment`.
+        """
+        fn = by(func)
+        if fn.frame == idaapi.BADADDR:
+            return
+        offsets, layout = cls.__layout__(fn.frame)
+
+        # seek to the member containing the offset, and then yield until we've consumed the size
+        index = max(0, bisect.bisect_right(offsets, offset) - 1)
+        for (m_offset, m_size), item in layout[index:]:
+            if m_offset + m_size <= offset:
+                continue
+            yield (m_offset, m_size), item
+            size -= m_size
+            if size <= 0: break
+        return
+
     @utils.multicase()
     @classmethod
     def delta(cls):
@@ -1287,7 +1489,7 @@ class frame(object):
                 logging.info("{:s}.arguments({:#x}) : Possibility that register-based arguments will not be listed due to non-implemented calling convention. Calling convention is {:#x}.".format(__name__, fn.startEA, cc))
 
             base = get_vars_size(fn)+get_regs_size(fn)
-            for (off, size), (name, _, _) in structure.fragment(fr.id, base, get_args_size(fn)):
+            for (off, size), (name, _, _) in frame.fragment(fn, base, get_args_size(fn)):
                 yield off - base, name, size
             return
 
@@ -1360,6 +1562,16 @@ get_spdelta = spdelta = utils.alias(frame.delta, 'frame')
 arguments = args = frame.args
 
 ## instruction iteration/searching
+@utils.multicase()
+def decode():
+    '''Decode each instruction in the current function and return them as an `interface.columns_t` of parallel arrays.'''
+    return decode(ui.current.function())
+@utils.multicase()
+def decode(func):
+    '''Decode each instruction in the function ``func`` and return them as an `interface.columns_t` of parallel arrays.'''
+    fn = by(func)
+    return instruction.decode_addresses(chunks.iterate(fn))
+
 ## tagging
 @utils.multicase()
 def tag():
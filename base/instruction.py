@@ -41,7 +41,7 @@ import six
 from six.moves import builtins
 
 import functools, operator, itertools, types
-import logging, collections
+import logging, collections, array
 
 import database, function
 import structure, enumeration
@@ -90,6 +90,94 @@ class __optype__(object):
         '''Return the size of the operand identified by ``op`` for the specified ``processor``.'''
         return idaapi.get_dtyp_size(op.dtyp)
 
+## decoded instruction cache
+class cache(object):
+    """
+    This namespace contains a bounded cache of each `idaapi.insn_t` that
+    has been decoded by `instruction.at`. As every tool within this module
+    will decode the instruction at the address it was given, this allows
+    them to share a single decoding of each instruction. The least
+    recently used instruction is discarded when the cache is full.
+
+    Any instructions that are cached at an address are discarded when
+    the address is patched, or when code or data is created at it.
+
+    Some ways of using this namespace are::
+
+        > print instruction.cache.stats()
+        > instruction.cache.resize(0x1000)
+        > instruction.cache.clear()
+
+    """
+    maximum, span = 0x1000, 0x10
+    state = collections.OrderedDict()
+    hits = misses = 0
+
+    @classmethod
+    def get(cls, ea):
+        '''Return the `idaapi.insn_t` that was cached for the address ``ea`` or ``None`` if it is not cached.'''
+        res = cls.state.pop(ea, None)
+        if res is None:
+            cls.misses += 1
+            return None
+        cls.state[ea], cls.hits = res, cls.hits + 1
+        return res
+
+    @classmethod
+    def set(cls, ea, insn):
+        '''Store the `idaapi.insn_t` specified by ``insn`` for the address ``ea``.'''
+        cls.state.pop(ea, None)
+        while cls.state and len(cls.state) >= cls.maximum:
+            cls.state.popitem(last=False)
+        if cls.maximum > 0:
+            cls.state[ea] = insn
+        return insn
+
+    @utils.multicase(ea=six.integer_types)
+    @classmethod
+    def discard(cls, ea):
+        '''Discard any instruction that was cached for the address ``ea``.'''
+        return cls.discard(ea, ea + 1)
+    @utils.multicase(start=six.integer_types, end=six.integer_types)
+    @classmethod
+    def discard(cls, start, end):
+        '''Discard any cached instructions that overlap the addresses ``start`` to ``end``.'''
+        # an instruction can begin before the range, so include the largest one that can be decoded
+        left = max(0, start - cls.span)
+        if end - left < len(cls.state):
+            candidates = (ea for ea in six.moves.range(left, end) if ea in cls.state)
+        else:
+            candidates = (ea for ea in cls.state.keys() if left <= ea < end)
+
+        res = [ea for ea in candidates if ea + cls.state[ea].size > start]
+        for ea in res:
+            del(cls.state[ea])
+        return len(res)
+
+    @classmethod
+    def clear(cls):
+        '''Discard every instruction that has been cached and reset the statistics.'''
+        cls.state.clear()
+        cls.hits = cls.misses = 0
+
+    @classmethod
+    def resize(cls, maximum):
+        '''Change the number of instructions that can be cached to ``maximum``.'''
+        res, cls.maximum = cls.maximum, maximum
+        while cls.state and len(cls.state) > max(0, maximum):
+            cls.state.popitem(last=False)
+        return res
+
+    @classmethod
+    def stats(cls):
+        '''Return a dictionary containing the statistics of the cache.'''
+        total = cls.hits + cls.misses
+        return {
+            'hits' : cls.hits, 'misses' : cls.misses,
+            'count' : len(cls.state), 'maximum' : cls.maximum,
+            'ratio' : float(cls.hits) / total if total else 0.0,
+        }
+
 ## general functions
 @utils.multicase()
 def at():
@@ -97,17 +185,25 @@ def at():
     return at(ui.current.address())
 @utils.multicase(ea=six.integer_types)
 def at(ea):
-    '''Returns the `idaapi.insn_t` instance at the address ``ea``.'''
+    """Returns the `idaapi.insn_t` instance at the address ``ea``.
+
+    The instance that is returned is shared with the instruction cache and should not be modified.
+    """
     ea = interface.address.inside(ea)
     if not database.is_code(ea):
         raise TypeError("{:s}.at({:#x}) : Unable to decode a non-instruction at specified address.".format(__name__, ea))
+
+    res = cache.get(ea)
+    if res is not None:
+        return res
+
     length = idaapi.decode_insn(ea)
     if idaapi.__version__ < 7.0:
-        return idaapi.cmd.copy()
+        return cache.set(ea, idaapi.cmd.copy())
 
     tmp = idaapi.insn_t()
     tmp.assign(idaapi.cmd)
-    return tmp
+    return cache.set(ea, tmp)
 
 @utils.multicase()
 def size():
@@ -301,6 +397,49 @@ def ops_register(ea, reg, *regs, **modifiers):
     return tuple(filter(functools.partial(uses, ea), iterops(ea)))
 ops_reg = ops_regs = utils.alias(ops_register)
 
+## functions vs multiple insns
+def decode_addresses(iterable):
+    """Decode the instruction at each address in ``iterable`` and return their attributes and operands as an `interface.columns_t` of parallel arrays.
+
+    Any address that is not an instruction will be skipped.
+    """
+    # use a native array for addresses and values only if it can hold the address size of the database
+    wide = array.array('L').itemsize * 8 >= database.config.bits()
+    address, opvalue = (array.array('L'), array.array('L')) if wide else ([], [])
+    size, itype, feature, offset = array.array('B'), array.array('H'), array.array('L'), array.array('L', [0])
+    optype, opreg, opsize, opstate = array.array('B'), array.array('H'), array.array('B'), array.array('B')
+    mnemonic = {}
+
+    for ea in iterable:
+        if not database.is_code(ea): continue
+        insn = at(ea)
+        F = insn.get_canon_feature()
+
+        address.append(insn.ea), size.append(insn.size), itype.append(insn.itype), feature.append(F)
+        if insn.itype not in mnemonic:
+            mnemonic[insn.itype] = (insn.get_canon_mnem() or '').lower()
+
+        # now we can add each of the operands until we hit an idaapi.o_void
+        for opnum, op in enumerate(itertools.takewhile(utils.fcompose(operator.attrgetter('type'), functools.partial(operator.ne, idaapi.o_void)), insn.Operands)):
+            optype.append(op.type), opreg.append(op.reg), opsize.append(idaapi.get_dtyp_size(op.dtyp))
+            opvalue.append(op.value if op.type == idaapi.o_imm else op.addr)
+            opstate.append((1 if F & ops_state.read[opnum] else 0) | (2 if F & ops_state.write[opnum] else 0))
+        offset.append(len(optype))
+    return interface.columns_t(address, size, itype, feature, mnemonic, offset, optype, opvalue, opreg, opsize, opstate)
+
+@utils.multicase()
+def decode_range():
+    '''Decode each instruction within the current selection and return them as an `interface.columns_t` of parallel arrays.'''
+    left, right = ui.current.selection()
+    return decode_range(left, database.address.next(right))
+@utils.multicase(start=six.integer_types, end=six.integer_types)
+def decode_range(start, end):
+    """Decode each instruction from the address ``start`` to ``end`` and return them as an `interface.columns_t` of parallel arrays.
+
+    The arrays can be passed directly to the `numpy.frombuffer` function in order to filter them.
+    """
+    return decode_addresses(database.address.iterate(start, end))
+
 ## functions vs a specific operand of an insn
 @utils.multicase(opnum=six.integer_types)
 def op_repr(opnum):
@@ -515,6 +654,18 @@ def op_structure(ea, opnum, path, **delta):
     if not database.type.is_code(ea):
         raise TypeError("{:s}.op_structure({:#x}, {:#x}, {!r}, delta={:d}) : Item type at requested address is not code.".format(__name__, ea, opnum, path, delta.get('delta', 0)))
 
+    # resolve the path into the identifier of each of its members and apply it
+    ids, moff = __structure_path__(ea, opnum, path, **delta)
+    return idaapi.op_stroff(ea, opnum, __tid_array__(ids).cast(), len(ids), moff + delta.get('delta', 0))
+op_struct = utils.alias(op_structure)
+
+def __structure_path__(ea, opnum, path, **delta):
+    """Resolve the structure members in ``path`` for the operand ``opnum`` at ``ea`` into a tuple of their identifiers.
+
+    Returns the tuple of identifiers along with the offset of the last member.
+    """
+    path = list(path)
+
     # validate the path
     if len(path) == 0:
         raise ValueError("{:s}.op_structure({:#x}, {:#x}, {!r}, delta={:d}) : No structure members were specified.".format(__name__, ea, opnum, path, delta.get('delta', 0)))
@@ -535,15 +686,14 @@ def op_structure(ea, opnum, path, **delta):
         logging.warn("{:s}.op_structure({:#x}, {:#x}, {!r}, delta={:d}) : Cropping path down to {:d} elements due to invalid types being used to specify the structure path.".format(__name__, ea, opnum, path, delta.get('delta', 0), len(path) - len(res) + 1))
     path = res[:]
 
-    # if the delta is in the path, move it into the delta kwarg
-    if isinstance(path[-1], six.integer_types):
-        delta['delta'] = delta.get('delta', 0) + path.pop(-1)
+    # if the delta is in the path, then add it to the offset of the members
+    moff = path.pop(-1) if isinstance(path[-1], six.integer_types) else 0
 
     # figure out the structure that this all starts with
-    sptr, path = path[0].ptr, list(path)
+    sptr = path[0].ptr
 
     # collect each member resolving them to an id
-    moff, tids = 0, []
+    tids = [sptr.id]
     for item in path[1:]:
         if isinstance(item, basestring):
             m = idaapi.get_member_by_name(sptr, item)
@@ -560,29 +710,69 @@ def op_structure(ea, opnum, path, **delta):
             break
 
         # continue to the next iteration
-        res = mptr
+        sptr = mptr
 
     # check what was different
-    if len(path) != len(tids) + 1:
+    if len(path) != len(tids):
         logging.warn("{:s}.op_structure({:#x}, {:#x}, {!r}, delta={:d}) : There was an error trying to determine the path for the list of members (not all members were pointing to structures).".format(__name__, ea, opnum, path, delta.get('delta', 0)))
+    return tuple(tids), moff
 
-    # build the list of member ids and prefix it with a structure id
-    length = len(tids) + 1
-    tid = idaapi.tid_array(length)
-    tid[0] = sptr.id
-    for i, id in enumerate(tids):
-        tid[i + 1] = id
+def __tid_array__(ids):
+    '''Return an `idaapi.tid_array` containing the identifiers in ``ids``.'''
+    res = idaapi.tid_array(len(ids))
+    for i, id in enumerate(ids):
+        res[i] = id
+    return res
 
-    # figure out the real position (ida handles this actually)
-    # value = operand(ea, opnum).value if opt(ea, opnum) == 'immediate' else operand(ea, opnum).addr
-    ofs = moff + delta.get('delta', 0)
+@utils.multicase()
+def op_structures(iterable, **delta):
+    """Apply the structure path to the operand for each ``(address, opnum, path)`` or ``(address, opnum, path, delta)`` in ``iterable``.
 
-    # now we can finally apply the path to the specified operand
-    ok = idaapi.op_stroff(ea, opnum, tid.cast(), length, ofs)
-    #ok = idaapi.set_stroff_path(ea, opnum, tid.cast(), length, moff - ofs)
+    Each path can be a `structure_t`, a `member_t`, an identifier, or a list of
+    them similar to `op_structure`. If the offset ``delta`` is specified, shift
+    every structure by that amount. Each distinct path is only resolved once.
+    Returns a list of ``(address, opnum, ok)`` for each operand.
+    """
+    paths, arrays, result = {}, {}, []
+    for item in iterable:
+        (ea, opnum, path), extra = item[:3], item[3] if len(item) > 3 else 0
+        if not database.type.is_code(ea):
+            logging.warn("{:s}.op_structures(...) : Skipping operand {:d} at {:#x} as the item type is not code.".format(__name__, opnum, ea))
+            result.append((ea, opnum, False))
+            continue
 
-    return ok
-op_struct = utils.alias(op_structure)
+        # resolve the path if we haven't seen it yet
+        key = tuple(n.id if isinstance(n, (structure.structure_t, structure.member_t)) else n for n in path) if isinstance(path, (types.TupleType, types.ListType)) else path.id if isinstance(path, (structure.structure_t, structure.member_t)) else path
+        if key not in paths:
+            if isinstance(path, six.integer_types):
+                mptr, _, sptr = idaapi.get_member_by_id(path)
+                path = [structure.by(path)] if mptr is None else [structure.by(sptr.id).by_identifier(path)]
+            elif isinstance(path, (structure.structure_t, structure.member_t)):
+                path = [path]
+            paths[key] = ids, _ = __structure_path__(ea, opnum, path, **delta)
+            if ids not in arrays:
+                arrays[ids] = __tid_array__(ids)
+        ids, moff = paths[key]
+
+        # now we can apply the path that we cached to the operand
+        ok = idaapi.op_stroff(ea, opnum, arrays[ids].cast(), len(ids), moff + extra + delta.get('delta', 0))
+        result.append((ea, opnum, True if ok else False))
+
+    count = sum(1 for _, _, ok in result if ok)
+    logging.info("{:s}.op_structures(...) : Applied {:d} of {:d} structure path{:s} using {:d} distinct path{:s}.".format(__name__, count, len(result), '' if len(result) == 1 else 's', len(arrays), '' if len(arrays) == 1 else 's'))
+    return result
+@utils.multicase(reg=(basestring, interface.register_t))
+def op_structures(func, reg, path, **delta):
+    """Apply the structure ``path`` to each memory operand in the function ``func`` that uses the register ``reg``.
+
+    If the offset ``delta`` is specified, shift every structure by that amount.
+    Returns a list of ``(address, opnum, ok)`` for each operand.
+    """
+    items = []
+    for ea in function.iterate(func):
+        insn = at(ea)
+        items.extend((ea, opnum, path) for opnum in ops_register(ea, reg) if insn.Operands[opnum].type in {idaapi.o_displ, idaapi.o_phrase})
+    return op_structures(items, **delta)
 
 @utils.multicase(opnum=six.integer_types)
 def op_enumeration(opnum):
@@ -774,6 +964,94 @@ def op_refs(ea, opnum):
 op_ref = utils.alias(op_refs)
 
 ## types of instructions
+class classes(object):
+    """
+    This namespace contains a table for the current processor that maps
+    the type of each instruction (``itype``) to a bitmask of the classes
+    that it belongs to. The table is built from the features of each of
+    the processor's instructions whenever the processor is changed, and
+    is used by the ``is_`` functions and `instruction.classify` so that
+    they can classify an instruction without checking its features.
+
+    Only the ``SHIFT``, ``CALL``, ``STOP``, and ``JUMP`` classes are
+    stored in the table. The other classes depend on the references
+    made by an instruction and are determined by `instruction.classify`.
+    """
+    SHIFT, CALL, STOP, JUMP = 0x1, 0x2, 0x4, 0x8
+    RETURN, BRANCH, JMP, JXX, JMPI, CALLI = 0x10, 0x20, 0x40, 0x80, 0x100, 0x200
+    start, table = 0, array.array('H')
+
+    @classmethod
+    def feature(cls, feature):
+        '''Return the classes for an instruction with the specified ``feature``.'''
+        res = 0
+        res |= cls.SHIFT if feature & idaapi.CF_SHFT == idaapi.CF_SHFT else 0
+        res |= cls.CALL if feature & idaapi.CF_CALL == idaapi.CF_CALL else 0
+        res |= cls.STOP if feature & idaapi.CF_STOP == idaapi.CF_STOP else 0
+        res |= cls.JUMP if feature & idaapi.CF_JUMP == idaapi.CF_JUMP else 0
+        return res
+
+    @classmethod
+    def of(cls, insn):
+        '''Return the classes that are stored in the table for the `idaapi.insn_t` specified by ``insn``.'''
+        index = insn.itype - cls.start
+        if 0 <= index < len(cls.table):
+            return cls.table[index]
+        return cls.feature(insn.get_canon_feature())
+
+    @classmethod
+    def __build__(cls):
+        '''Build the table of classes for each instruction belonging to the current processor.'''
+        instructions = idaapi.ph_get_instruc() if hasattr(idaapi, 'ph_get_instruc') else []
+
+        # the table is indexed from the first instruction of the processor
+        cls.start = idaapi.ph_get_instruc_start() if hasattr(idaapi, 'ph_get_instruc_start') else 0
+        cls.table = array.array('H', (cls.feature(feature) for _, feature in instructions))
+        return len(cls.table)
+
+@utils.multicase()
+def classify():
+    '''Return the bitmask of `instruction.classes` for the instruction at the current address.'''
+    return classify(ui.current.address())
+@utils.multicase(ea=six.integer_types)
+def classify(ea):
+    """Return the bitmask of `instruction.classes` for the instruction at the address ``ea``.
+
+    If the address is not an instruction, then return 0.
+    """
+    ea = interface.address.inside(ea)
+    if not database.is_code(ea):
+        return 0
+    res = classes.of(at(ea))
+
+    # the processor module knows better than the features whether an instruction is a call
+    idaapi.decode_insn(ea) if idaapi.__version__ < 7.0 and any(hasattr(idaapi, name) for name in ('is_call_insn', 'is_ret_insn')) else None
+    if hasattr(idaapi, 'is_call_insn'):
+        res = (res | classes.CALL) if idaapi.is_call_insn(ea) else (res & ~classes.CALL)
+
+    # figure out whether the instruction is a return
+    if hasattr(idaapi, 'is_ret_insn'):
+        res |= classes.RETURN if idaapi.is_ret_insn(ea) else 0
+    else:
+        res |= classes.RETURN if res & classes.STOP else 0
+
+    # now we can use the code references to determine what kind of branch it is
+    if res & classes.CALL:
+        return res | (classes.CALLI if res & classes.JUMP else 0)
+    count = len(builtins.list(interface.xiterate(ea, idaapi.get_first_cref_from, idaapi.get_next_cref_from)))
+    res |= classes.JMP if res & classes.STOP and count == 1 and not res & classes.RETURN else 0
+    res |= classes.JXX if not res & classes.STOP and count > 1 else 0
+    res |= classes.JMPI if res & classes.JUMP else 0
+    return res | (classes.BRANCH if res & (classes.JMP | classes.JXX | classes.JMPI) else 0)
+@utils.multicase(start=six.integer_types, end=six.integer_types)
+def classify(start, end):
+    '''Yield each ``(address, classes)`` for the instructions from the address ``start`` to ``end``.'''
+    for ea in database.address.iterate(start, end):
+        if database.is_code(ea):
+            yield ea, classify(ea)
+        continue
+    return
+
 @utils.multicase()
 def is_return():
     '''Returns true if the current instruction is a return-type instruction.'''
@@ -782,7 +1060,7 @@ def is_return():
 def is_return(ea):
     '''Returns true if the instruction at ``ea`` is a return-type instruction.'''
     ea = interface.address.inside(ea)
-    returnQ = lambda ea: feature(ea) & idaapi.CF_STOP == idaapi.CF_STOP
+    returnQ = lambda ea: classes.of(at(ea)) & classes.STOP == classes.STOP
 
     # Older versions of IDA required idaapi.cmd to be populated for is_ret_insn to work.
     if hasattr(idaapi, 'is_ret_insn'):
@@ -800,7 +1078,7 @@ def is_shift():
 def is_shift(ea):
     '''Returns true if the instruction at ``ea`` is a bit-shifting instruction.'''
     ea = interface.address.inside(ea)
-    return database.is_code(ea) and feature(ea) & idaapi.CF_SHFT == idaapi.CF_SHFT
+    return database.is_code(ea) and classes.of(at(ea)) & classes.SHIFT == classes.SHIFT
 isShift = shiftQ = utils.alias(is_shift)
 
 @utils.multicase()
@@ -822,9 +1100,11 @@ def is_jmp():
 def is_jmp(ea):
     '''Returns true if the instruction at ``ea`` is an immediate and indrect branch.'''
     ea = interface.address.inside(ea)
+    if not database.is_code(ea):
+        return False
 
-    F, X = feature(ea), interface.xiterate(ea, idaapi.get_first_cref_from, idaapi.get_next_cref_from)
-    return database.is_code(ea) and (F & idaapi.CF_CALL != idaapi.CF_CALL) and (F & idaapi.CF_STOP == idaapi.CF_STOP) and len(list(X)) == 1 and not is_return(ea)
+    F, X = classes.of(at(ea)), interface.xiterate(ea, idaapi.get_first_cref_from, idaapi.get_next_cref_from)
+    return (F & classes.CALL != classes.CALL) and (F & classes.STOP == classes.STOP) and len(list(X)) == 1 and not is_return(ea)
 isJmp = JmpQ = jmpQ = utils.alias(is_jmp)
 
 @utils.multicase()
@@ -835,9 +1115,11 @@ def is_jxx():
 def is_jxx(ea):
     '''Returns true if the instruction at ``ea`` is a conditional branch.'''
     ea = interface.address.inside(ea)
+    if not database.is_code(ea):
+        return False
 
-    F, X = feature(ea), interface.xiterate(ea, idaapi.get_first_cref_from, idaapi.get_next_cref_from)
-    return database.is_code(ea) and all((F&x != x) for x in {idaapi.CF_CALL, idaapi.CF_STOP}) and len(list(X)) > 1
+    F, X = classes.of(at(ea)), interface.xiterate(ea, idaapi.get_first_cref_from, idaapi.get_next_cref_from)
+    return all((F&x != x) for x in {classes.CALL, classes.STOP}) and len(list(X)) > 1
 isJxx = JxxQ = jxxQ = utils.alias(is_jxx)
 
 @utils.multicase()
@@ -848,8 +1130,10 @@ def is_jmpi():
 def is_jmpi(ea):
     '''Returns true if the instruction at ``ea`` is an indirect branch.'''
     ea = interface.address.inside(ea)
-    F = feature(ea)
-    return database.is_code(ea) and (F & idaapi.CF_CALL != idaapi.CF_CALL) and (F & idaapi.CF_JUMP == idaapi.CF_JUMP)
+    if not database.is_code(ea):
+        return False
+    F = classes.of(at(ea))
+    return (F & classes.CALL != classes.CALL) and (F & classes.JUMP == classes.JUMP)
 isJmpi = JmpiQ = jmpiQ = utils.alias(is_jmpi)
 
 @utils.multicase()
@@ -863,9 +1147,7 @@ def is_call(ea):
     if hasattr(idaapi, 'is_call_insn'):
         idaapi.decode_insn(ea)
         return idaapi.is_call_insn(ea)
-
-    F = feature(ea)
-    return database.is_code(ea) and (feature(ea) & idaapi.CF_CALL == idaapi.CF_CALL)
+    return database.is_code(ea) and (classes.of(at(ea)) & classes.CALL == classes.CALL)
 isCall = callQ = utils.alias(is_call)
 
 @utils.multicase()
@@ -876,8 +1158,10 @@ def is_calli():
 def is_calli(ea):
     '''Returns true if the instruction at ``ea`` is an indirect call.'''
     ea = interface.address.inside(ea)
-    F = feature(ea)
-    return is_call(ea) and all(F&x == x for x in {idaapi.CF_CALL, idaapi.CF_JUMP})
+    if not database.is_code(ea):
+        return False
+    F = classes.of(at(ea))
+    return is_call(ea) and all(F&x == x for x in {classes.CALL, classes.JUMP})
 
 ## operand type registration
 ## XXX: This namespace is deleted after each method has been assigned to their lookup table
@@ -1496,6 +1780,11 @@ def __newprc__(id):
     the globals (``architecture`` and ``register``) within this module.
     """
     plfm, m = idaapi.ph.id, __import__('sys').modules[__name__]
+
+    # any instructions that were decoded for the previous processor are now invalid
+    cache.clear()
+    classes.__build__()
+
     if plfm == idaapi.PLFM_386:     # id == 15
         res = Intel()
     elif plfm == idaapi.PLFM_ARM:   # id == 1
@@ -1503,7 +1792,7 @@ def __newprc__(id):
     elif plfm == idaapi.PLFM_MIPS:  # id == 12
         res = Mips()
     else:
-        iogging.warn("{:s} : IDP_Hooks.newprc({:d}) : Unsupported processor type {:d} was specified. Tools that use the instruction module might not work properly.".format(__name__, id, plfm))
+        logging.warn("{:s} : IDP_Hooks.newprc({:d}) : Unsupported processor type {:d} was specified. Tools that use the instruction module might not work properly.".format(__name__, id, plfm))
         return
 
     # assign our required globals
@@ -36,7 +36,8 @@ from six.moves import builtins
 
 import functools, operator, itertools, types
 import os, logging
-import math, re, fnmatch
+import math, re, fnmatch, bisect
+import json, mmap
 
 import database
 import ui, internal
@@ -44,6 +45,116 @@ from internal import utils, interface
 
 import idaapi
 
+## segment table
+class cache(object):
+    """
+    This namespace contains a table of the segments within the database
+    and some of their metadata. The table is built by walking through
+    the segments once, and allows the segment containing an address or
+    the segment with a given name or selector to be found without needing
+    to ask IDA about every segment.
+
+    The table is discarded whenever a segment is added, removed, moved,
+    or resized.
+
+    Some ways of using this namespace are::
+
+        > index = segment.cache.index(ea)
+        > print segment.cache.get()
+        > segment.cache.clear()
+
+    """
+    state = None
+
+    @classmethod
+    def get(cls):
+        """Return the table of segments for the database.
+
+        The table is a tuple composed of a list of the starting address, a list of
+        the ending address, a list of the ``(name, selector, permissions, bits)`` for
+        each segment, and a dictionary of the indices for each name and selector.
+        """
+        if cls.state is not None and len(cls.state[0]) == idaapi.get_segm_qty():
+            return cls.state
+
+        starts, stops, attributes, names, selectors = [], [], [], {}, {}
+        for index in six.moves.range(idaapi.get_segm_qty()):
+            seg = idaapi.getnseg(index)
+            name, sel, perm, bits = cls.__attributes__(seg)
+            starts.append(seg.startEA), stops.append(seg.endEA)
+            attributes.append((name, sel, perm, bits))
+            names.setdefault(name, []).append(index)
+            selectors.setdefault(sel, []).append(index)
+        cls.state = res = starts, stops, attributes, names, selectors
+        return res
+
+    @classmethod
+    def attributes(cls, index):
+        """Return the ``(name, selector, permissions, bits)`` of the segment at ``index``.
+
+        IDA < 7.0 does not notify us when a segment is renamed or has its attributes
+        changed, so the segment is read from the database and the table is discarded
+        if it is different.
+        """
+        _, _, attributes, _, _ = cls.get()
+        if idaapi.__version__ >= 7.0:
+            return attributes[index]
+        res = cls.__attributes__(idaapi.getnseg(index))
+        if res != attributes[index]:
+            cls.clear()
+        return res
+
+    @classmethod
+    def find(cls, name=None, selector=None):
+        """Return the index of the first segment with the specified ``name`` or ``selector``, or ``None`` if there isn't one.
+
+        When IDA does not notify us of changes to a segment's attributes (IDA < 7.0),
+        the segment that was found is checked against the database and the table is
+        re-built if the segment was changed or nothing was found.
+        """
+        field, key = (0, name) if selector is None else (1, selector)
+        for attempt in six.moves.range(2):
+            _, _, _, names, selectors = cls.get()
+            res = next(iter((names if field == 0 else selectors).get(key, [])), None)
+            if attempt or idaapi.__version__ >= 7.0:
+                return res
+            elif res is not None and cls.attributes(res)[field] == key:
+                return res
+            cls.clear()
+        return res
+
+    @staticmethod
+    def __attributes__(seg):
+        '''Return the ``(name, selector, permissions, bits)`` of the segment ``seg`` that are stored in the table.'''
+        return None if seg is None else (idaapi.get_true_segm_name(seg), seg.sel, seg.perm, seg.abits())
+
+    @classmethod
+    def index(cls, ea):
+        '''Return the index of the segment containing the address ``ea`` or ``None`` if there isn't one.'''
+        starts, stops, _, _, _ = cls.get()
+        res = bisect.bisect_right(starts, ea) - 1
+        return res if res >= 0 and ea < stops[res] else None
+
+    @classmethod
+    def clear(cls, *args):
+        '''Discard the table of segments.'''
+        cls.state = None
+
+def __lookup__(segment):
+    '''Return the index of the segment identified by ``segment`` from the segment table.'''
+    if isinstance(segment, idaapi.segment_t):
+        res = cache.index(segment.startEA)
+    elif isinstance(segment, basestring):
+        res = cache.find(name=segment)
+    elif isinstance(segment, six.integer_types):
+        res = cache.index(interface.address.within(segment))
+    else:
+        res = cache.index(by(segment).startEA)
+
+    if res is None:
+        raise LookupError("{:s}.__lookup__({!r}) : Unable to locate segment.".format(__name__, segment))
+    return res
+
 ## enumerating
 __matcher__ = utils.matcher()
 __matcher__.boolean('regex', re.search, idaapi.get_true_segm_name)
@@ -61,9 +172,21 @@ def __iterate__(**type):
     if not type: type = {'predicate':lambda n: True}
     def newsegment(index):
         res = idaapi.getnseg(index)
-        res.index = index
+        if res is not None: res.index = index
         return res
-    res = builtins.map(newsegment, six.moves.range(idaapi.get_segm_qty()))
+
+    # use the segment table to narrow down the segments for any exact matches
+    # IDA < 7.0 doesn't tell us when a segment is renamed, so leave the names and selectors to the matcher
+    starts, _, _, names, selectors = cache.get()
+    indices = builtins.set(six.moves.range(len(starts)))
+    if 'name' in type and idaapi.__version__ >= 7.0:
+        indices &= builtins.set(names.get(type['name'], []))
+    if 'selector' in type and idaapi.__version__ >= 7.0:
+        indices &= builtins.set(selectors.get(type['selector'], []))
+    if 'index' in type:
+        indices &= {type['index']}
+
+    res = [seg for seg in builtins.map(newsegment, sorted(indices)) if seg is not None]
     for key, value in six.iteritems(type):
         res = builtins.list(__matcher__.match(key, value, res))
     for item in res: yield item
@@ -93,21 +216,24 @@ def list(**type):
 ## searching
 def by_name(name):
     '''Return the segment with the given ``name``.'''
-    s = idaapi.get_segm_by_name(name)
+    index = cache.find(name=name)
+    s = None if index is None else idaapi.getnseg(index)
     if s is None:
         raise LookupError("{:s}.by_name({!r}) : Unable to locate segment.".format(__name__, name))
     return s
 byName = utils.alias(by_name)
 def by_selector(selector):
     '''Return the segment associated with ``selector``.'''
-    s = idaapi.get_segm_by_sel(selector)
+    index = cache.find(selector=selector)
+    s = None if index is None else idaapi.getnseg(index)
     if s is None:
         raise LookupError("{:s}.by_selector({:#x}) : Unable to locate segment.".format(__name__, selector))
     return s
 bySelector = utils.alias(by_selector)
 def by_address(ea):
     '''Return the segment that contains the specified ``ea``.'''
-    s = idaapi.getseg(interface.address.within(ea))
+    index = cache.index(interface.address.within(ea))
+    s = None if index is None else idaapi.getnseg(index)
     if s is None:
         raise LookupError("{:s}.by_address({:#x}) : Unable to locate segment.".format(__name__, ea))
     return s
@@ -165,8 +291,9 @@ def bounds():
 @utils.multicase()
 def bounds(segment):
     '''Return the bounds of the segment specified by ``segment``.'''
-    seg = by(segment)
-    return seg.startEA, seg.endEA
+    starts, stops, _, _, _ = cache.get()
+    index = __lookup__(segment)
+    return starts[index], stops[index]
 range = utils.alias(bounds)
 
 @utils.multicase()
@@ -198,8 +325,9 @@ def size():
 @utils.multicase()
 def size(segment):
     '''Return the size of the segment specified by ``segment``.'''
-    seg = by(segment)
-    return seg.endEA - seg.startEA
+    starts, stops, _, _, _ = cache.get()
+    index = __lookup__(segment)
+    return stops[index] - starts[index]
 
 @utils.multicase()
 def offset():
@@ -240,6 +368,19 @@ def read(segment):
     return idaapi.get_many_bytes(seg.startEA, seg.endEA-seg.startEA)
 string = utils.alias(read)
 
+@utils.multicase()
+def view():
+    '''Return a `database.view` of the contents of the current segment.'''
+    segment = ui.current.segment()
+    if segment is None:
+        raise LookupError("{:s}.view() : Not currently positioned within a segment.".format(__name__))
+    return database.view(segment.startEA, segment.endEA)
+@utils.multicase()
+def view(segment):
+    '''Return a `database.view` of the contents of the segment identified by ``segment``.'''
+    seg = by(segment)
+    return database.view(seg.startEA, seg.endEA)
+
 @utils.multicase()
 def repr():
     '''Return the current segment in a printable form.'''
@@ -289,8 +430,8 @@ def name():
 @utils.multicase()
 def name(segment):
     '''Return the name of the segment identified by ``segment``.'''
-    seg = by(segment)
-    return idaapi.get_true_segm_name(seg)
+    name, _, _, _ = cache.attributes(__lookup__(segment))
+    return name
 
 @utils.multicase()
 def color():
@@ -331,7 +472,7 @@ def within():
 @utils.multicase(ea=six.integer_types)
 def within(ea):
     '''Returns true if the address ``ea`` is within any segment.'''
-    return any(segment.startEA <= ea < segment.endEA for segment in __iterate__())
+    return cache.index(ea) is not None
 
 @utils.multicase(ea=six.integer_types)
 def contains(ea):
@@ -340,37 +481,130 @@ def contains(ea):
 @utils.multicase(segaddr=six.integer_types, ea=six.integer_types)
 def contains(address, ea):
     '''Returns true if the address ``ea`` is contained within the segment belonging to the specified ``address``.'''
-    seg = by_address(address)
-    return contains(seg, ea)
+    starts, stops, _, _, _ = cache.get()
+    index = __lookup__(address)
+    return starts[index] <= ea < stops[index]
 @utils.multicase(name=basestring, ea=six.integer_types)
 def contains(name, ea):
     '''Returns true if the address ``ea`` is contained within the segment with the specified ``name``.'''
-    seg = by_name(name)
-    return contains(seg, ea)
+    starts, stops, _, _, _ = cache.get()
+    index = __lookup__(name)
+    return starts[index] <= ea < stops[index]
 @utils.multicase(segment=idaapi.segment_t, ea=six.integer_types)
 def contains(segment, ea):
     '''Returns true if the address ``ea`` is contained within the `idaapi.segment_t` specified by ``segment``.'''
     return segment.startEA <= ea < segment.endEA
 
 ## functions
+CHUNK_SIZE = 0x100000
+
+def __chunks(description, size, **options):
+    """Yield each ``(position, length)`` needed to transfer ``size`` bytes one chunk at a time.
+
+    If the keyword ``chunk`` is specified, then use it as the number of bytes to transfer per chunk.
+    If the bool ``progress`` is specified, then display a progress bar that can be used to cancel the transfer.
+    """
+    chunk = options.get('chunk', CHUNK_SIZE)
+    count = (size + chunk - 1) // chunk
+
+    P = ui.Progress() if options.get('progress', False) else None
+    if P:
+        P.update(current=0, min=0, max=count, title=description)
+        P.open()
+
+    try:
+        index, position = 0, 0
+        while position < size:
+            if P and P.canceled:
+                logging.warn("{:s} : Transfer was canceled by the user after {:#x} of {:#x} bytes.".format(description, position, size))
+                break
+            length = min(chunk, size - position)
+            yield position, length
+            index, position = index + 1, position + length
+            if P: P.update(current=index, text="Transferred chunk {:d} of {:d} ({:#x} of {:#x} bytes).".format(index, count, position, size))
+        return
+    finally:
+        if P: P.close()
+
 # shamefully ripped from idc.py
-def __load_file(filename, ea, size, offset=0):
-    path = os.path.abspath(filename)
+def __load_file(filename, ea, size, offset=0, **options):
+    path, transferred = os.path.abspath(filename), 0
+    description = "Loading {:s} into {:#x}:{:+#x}".format(os.path.basename(path), ea, size)
+
+    # if we were asked to mmap the file, then copy into the database from the mapping
+    if options.get('mmap', False):
+        with open(path, 'rb') as infile:
+
+            # an empty file can't be mapped, so there's nothing to transfer
+            if not os.fstat(infile.fileno()).st_size:
+                return transferred == size
+
+            mapping = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for position, length in __chunks(description, size, **options):
+                    data = mapping[offset + position : offset + position + length]
+                    if data and not idaapi.mem2base(data, ea + position, offset + position):
+                        break
+                    transferred += len(data)
+
+                    # if the file ended early, then we've transferred everything we can
+                    if len(data) < length:
+                        break
+                    continue
+            finally:
+                mapping.close()
+        return transferred == size
+
     res = idaapi.open_linput(path, False)
     if not res:
         raise IOError("{:s}.load_file({!r}, {:#x}, {:+#x}) : Unable to create loader_input_t from path \"{:s}\".".format(__name__, filename, ea, size, path))
-    ok = idaapi.file2base(res, offset, ea, ea+size, False)
-    idaapi.close_linput(res)
-    return ok
 
-def __save_file(filename, ea, size, offset=0):
-    path = os.path.abspath(filename)
+    try:
+        for position, length in __chunks(description, size, **options):
+            if not idaapi.file2base(res, offset + position, ea + position, ea + position + length, False):
+                break
+            transferred += length
+    finally:
+        idaapi.close_linput(res)
+    return transferred == size
+
+def __save_file(filename, ea, size, offset=0, **options):
+    path, transferred = os.path.abspath(filename), 0
+    description = "Saving {:#x}:{:+#x} to {:s}".format(ea, size, os.path.basename(path))
+
+    # if we were asked to mmap the file, then resize it so that it ends with
+    # the segment (like fopenWB would) and copy the database into the mapping
+    if options.get('mmap', False):
+        with open(path, 'r+b' if os.path.exists(path) else 'w+b') as outfile:
+            outfile.truncate(offset + size)
+            if not size:
+                return True
+
+            mapping = mmap.mmap(outfile.fileno(), 0, access=mmap.ACCESS_WRITE)
+            try:
+                for position, length in __chunks(description, size, **options):
+                    data = idaapi.get_many_bytes(ea + position, length)
+                    if data is None:
+                        data = ''.join(idaapi.get_many_bytes(item, 1) or '\0' for item in six.moves.range(ea + position, ea + position + length))
+                    mapping[offset + position : offset + position + length] = data
+                    transferred += length
+                mapping.flush()
+            finally:
+                mapping.close()
+        return transferred == size
+
     of = idaapi.fopenWB(path)
     if not of:
         raise IOError("{:s}.save_file({!r}, {:#x}, {:+#x}) : Unable to open target file \"{:s}\".".format(__name__, filename, ea, size, path))
-    res = idaapi.base2file(of, offset, ea, ea+size)
-    idaapi.eclose(of)
-    return res
+
+    try:
+        for position, length in __chunks(description, size, **options):
+            if not idaapi.base2file(of, offset + position, ea + position, ea + position + length):
+                break
+            transferred += length
+    finally:
+        idaapi.eclose(of)
+    return transferred == size
 
 def load(filename, ea, size=None, offset=0, **kwds):
     """Load the specified ``filename`` to the address ``ea`` as a segment.
@@ -378,11 +612,14 @@ def load(filename, ea, size=None, offset=0, **kwds):
     If ``size`` is not specified, use the length of the file.
     The keyword ``offset`` represents the offset into the file to use.
     The keyword ``name`` can be used to name the segment.
+    The keyword ``chunk`` can be used to specify the number of bytes to load at a time.
+    If the bool ``mmap`` is specified, then memory-map the file instead of reading it.
+    If the bool ``progress`` is specified, then display the progress of loading the file.
     """
     filesize = os.stat(filename).st_size
 
     cb = filesize - offset if size is None else size
-    res = __load_file(filename, ea, cb, offset)
+    res = __load_file(filename, ea, cb, offset, **kwds)
     if not res:
         raise IOError("{:s}.load({!r}, {:#x}, {:+#x}, {:#x}) : Unable to load file into {:#x}:{:+#x} from \"{:s}\".".format(__name__, filename, ea, cb, offset, ea, cb, os.path.relpath(filename)))
     return new(ea, cb, kwds.get('name', os.path.split(filename)[1]))
@@ -480,16 +717,47 @@ def remove(segment, remove=False):
     return res
 delete = utils.alias(remove)
 
-def save(filename, segment, offset=0):
+def save(filename, segment, offset=0, **options):
     """Export the segment identified by ``segment`` to the file named ``filename``.
 
     If the int ``offset`` is specified, then begin writing into the file at the specified offset.
+    The keyword ``chunk`` can be used to specify the number of bytes to write at a time.
+    If the bool ``mmap`` is specified, then memory-map the file and write into that.
+    If the bool ``progress`` is specified, then display the progress of writing the segment.
     """
     if isinstance(segment, idaapi.segment_t):
-        return __save_file(filename, segment.startEA, size(segment), offset)
-    return save(filename, by(segment))
+        return __save_file(filename, segment.startEA, size(segment), offset, **options)
+    return save(filename, by(segment), offset, **options)
 export = utils.alias(save)
 
+def save_all(directory, **options):
+    """Export every segment in the database into ``directory`` along with a manifest describing each of them.
+
+    The manifest is written as json to a file named "manifest.json" unless the keyword ``manifest`` is specified.
+    Any of the other keywords in ``options`` are passed directly to `segment.save`.
+    """
+    path = os.path.abspath(directory)
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    manifest = options.pop('manifest', 'manifest.json')
+
+    result = []
+    for seg in __iterate__():
+        name = idaapi.get_true_segm_name(seg)
+        filename = "{:d}.{:s}.bin".format(seg.index, re.sub(r'[^\w.-]', '_', name).lstrip('.') or 'segment')
+        if not save(os.path.join(path, filename), seg, **options):
+            raise IOError("{:s}.save_all({!r}) : Unable to export segment {:s} ({:#x}<>{:#x}) to \"{:s}\".".format(__name__, directory, name, seg.startEA, seg.endEA, os.path.join(path, filename)))
+        result.append({
+            'index' : seg.index, 'name' : name, 'filename' : filename,
+            'start' : seg.startEA, 'end' : seg.endEA, 'size' : seg.endEA - seg.startEA,
+            'selector' : seg.sel, 'permissions' : seg.perm, 'bits' : seg.abits(),
+        })
+
+    with open(os.path.join(path, manifest), 'wt') as outfile:
+        json.dump(result, outfile, indent=4)
+    return result
+exportall = export_all = utils.alias(save_all)
+
 #res = idaapi.add_segment_translation(ea, selector)
 #res = idaapi.del_segment_translation(ea)
 
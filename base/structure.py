@@ -37,9 +37,9 @@ Some examples of using these keywords are as follows::
 import six
 from six.moves import builtins
 
-import functools, operator, itertools, types
+import functools, operator, itertools, types, collections
 import sys, logging
-import math, re, fnmatch
+import math, re, fnmatch, bisect
 
 import database, instruction
 import ui, internal
@@ -704,6 +704,37 @@ class members_t(object):
         self.__owner = owner
         self.baseoffset = baseoffset
 
+    # cache of the index for the members of each structure keyed by its id
+    __cache__ = {}
+
+    @classmethod
+    def __invalidate__(cls, id=None):
+        '''Discard the index of the structure identified by ``id``, or every structure if it is not specified.'''
+        if id is None:
+            return cls.__cache__.clear()
+        cls.__cache__.pop(id, None)
+
+    def __table__(self):
+        """Return the index for the members of the structure.
+
+        The index is a tuple composed of the sorted starting and ending offset for each member,
+        a dictionary of each member name, and a dictionary of each member id to its index.
+        """
+        sptr = self.owner.ptr
+        res = self.__cache__.get(sptr.id, None)
+        if res is not None and len(res[0]) == sptr.memqty:
+            return res
+
+        # walk through all the members once and collect what we need
+        starts, stops, names, ids = [], [], {}, {}
+        for index in six.moves.range(sptr.memqty):
+            m = sptr.get_member(index)
+            starts.append(m.soff), stops.append(m.eoff)
+            names.setdefault(idaapi.get_member_name(m.id) or '', index)
+            ids[m.id] = index
+        res = self.__cache__[sptr.id] = starts, stops, names, ids
+        return res
+
     def __getstate__(self):
         return (self.owner.name, self.baseoffset, map(self.__getitem__, six.moves.range(len(self))))
     def __setstate__(self, state):
@@ -726,6 +757,22 @@ class members_t(object):
         for idx in six.moves.range(len(self)):
             yield member_t(self.owner, idx)
         return
+    def snapshot(self):
+        """Return a list of `record_t` containing the attributes of all the members within the structure.
+
+        Each attribute is fetched from the database in a single pass over the
+        members, and the resulting records will not change if the structure does.
+        """
+        owner, sptr, base = self.owner, self.owner.ptr, self.baseoffset
+        res = []
+        for index in six.moves.range(0 if sptr is None else sptr.memqty):
+            m = sptr.get_member(index)
+            flag, size, typeid = m.flag, idaapi.get_member_size(m), member_t.__typeid__(m)
+            name = idaapi.get_member_name(m.id) or ''
+            comment = idaapi.get_member_cmt(m.id, True) or idaapi.get_member_cmt(m.id, False)
+            res.append(record_t(owner, index, m.id, m.soff + base, size, flag, typeid, name, '.'.join((owner.name, name)), comment, member_t.__type__(flag, typeid, size, m.soff + base)))
+        return res
+
     def __getitem__(self, index):
         '''Return the member at the specified ``index``.'''
         if isinstance(index, six.integer_types):
@@ -734,7 +781,7 @@ class members_t(object):
         elif isinstance(index, six.string_types):
             res = self.byname(index)
         elif isinstance(index, slice):
-            res = [self.__getitem__(i) for i in six.moves.range(self.owner.ptr.memqty)].__getitem__(index)
+            res = [member_t(self.owner, i) for i in six.moves.range(*index.indices(self.owner.ptr.memqty))]
         else:
             raise TypeError, index
 
@@ -744,10 +791,9 @@ class members_t(object):
 
     def index(self, member_t):
         '''Return the index of the member specified by ``member_t``.'''
-        for i in six.moves.range(self.owner.ptr.memqty):
-            if member_t.id == self[i].id:
-                return i
-            continue
+        _, _, _, ids = self.__table__()
+        if member_t.id in ids:
+            return ids[member_t.id]
         raise ValueError("{:s}.instance({:s}).members.index : The member {!r} is not in the members list.".format(__name__, self.owner.name, member_t))
 
     __member_matcher = utils.matcher()
@@ -819,55 +865,68 @@ class members_t(object):
 
     def by_name(self, name):
         '''Return the member with the specified ``name``.'''
-        mem = idaapi.get_member_by_name(self.owner.ptr, name)
-        if mem is None:
+        _, _, names, _ = self.__table__()
+        if name not in names:
             raise KeyError("{:s}.instance({:s}).members.by_name : Unable to find member with requested name {!r}.".format(__name__, self.owner.name, name))
-        index = self.index(mem)
-        return self[index]
+        return member_t(self.owner, names[name])
     byname = byName = utils.alias(by_name, 'members_t')
 
     def by_fullname(self, fullname):
         '''Return the member with the specified ``fullname``.'''
-        mem = idaapi.get_member_by_fullname(self.owner.ptr, fullname)
-        if mem is None:
+        _, _, names, _ = self.__table__()
+
+        # the owner's name can contain a '.', so strip it off as a prefix
+        prefix = "{:s}.".format(self.owner.name)
+        name = fullname[len(prefix):] if fullname.startswith(prefix) else None
+        if name not in names:
             raise KeyError("{:s}.instance({:s}).members.by_fullname : Unable to find member with full name {!r}.".format(__name__, self.owner.name, fullname))
-        index = self.index(mem)
-        return self[index]
+        return member_t(self.owner, names[name])
     byfullname = byFullname = utils.alias(by_fullname, 'members_t')
 
     def by_offset(self, offset):
         '''Return the member at the specified ``offset``.'''
-        min, max = map(lambda sz: sz + self.baseoffset, (idaapi.get_struc_first_offset(self.owner.ptr), idaapi.get_struc_last_offset(self.owner.ptr)))
+        if self.owner.ptr.is_union():
+            return self.__by_offset_union(offset)
 
-        mptr = idaapi.get_member(self.owner.ptr, max - self.baseoffset)
-        msize = idaapi.get_member_size(mptr)
-        if (offset < min) or (offset >= max+msize):
-            raise LookupError("{:s}.instance({:s}).members.by_offset : Requested offset {:+#x} not within bounds {:#x}<>{:#x}.".format(__name__, self.owner.name, offset, min, max+msize))
+        starts, stops, _, _ = self.__table__()
+        min, max = (starts[0], stops[-1]) if starts else (0, 0)
+        if (offset < min + self.baseoffset) or (offset >= max + self.baseoffset):
+            raise LookupError("{:s}.instance({:s}).members.by_offset : Requested offset {:+#x} not within bounds {:#x}<>{:#x}.".format(__name__, self.owner.name, offset, min + self.baseoffset, max + self.baseoffset))
 
+        # bisect for the member that contains the offset
+        res = offset - self.baseoffset
+        index = bisect.bisect_right(starts, res) - 1
+        if index < 0 or res >= stops[index]:
+            raise LookupError("{:s}.instance({:s}).members.by_offset : Unable to find member at offset {:+#x}.".format(__name__, self.owner.name, offset))
+        return member_t(self.owner, index)
+    def __by_offset_union(self, offset):
         mem = idaapi.get_member(self.owner.ptr, offset - self.baseoffset)
         if mem is None:
             raise LookupError("{:s}.instance({:s}).members.by_offset : Unable to find member at offset {:+#x}.".format(__name__, self.owner.name, offset))
-
-        index = self.index(mem)
-        return self[index]
+        return member_t(self.owner, self.index(mem))
     byoffset = byOffset = utils.alias(by_offset, 'members_t')
 
     def by_identifier(self, id):
         '''Return the member in the structure that has the specified ``id``.'''
-        mem, fn, st = idaapi.get_member_by_id(id)
-        if mem is None:
+        _, _, _, ids = self.__table__()
+        if id not in ids:
             raise KeyError("{:s}.instance({:s}).members.by_id : Unable to find member with id {:#x}.".format(__name__, self.owner.name, id))
-        index = self.index(mem)
-        return self[index]
+        return member_t(self.owner, ids[id])
     by_id = byId = byIdentifier = utils.alias(by_identifier, 'members_t')
 
     def near_offset(self, offset):
         '''Return the member nearest to the specified ``offset``.'''
-        min, max = map(lambda sz: sz + self.baseoffset, (idaapi.get_struc_first_offset(self.owner.ptr), idaapi.get_struc_last_offset(self.owner.ptr)))
+        starts, stops, _, _ = self.__table__()
+        min, max = (starts[0] + self.baseoffset, starts[-1] + self.baseoffset) if starts else (self.baseoffset, self.baseoffset)
         if (offset < min) or (offset >= max):
             logging.warn("{:s}.instance({:s}).members.near_offset : Requested offset {:+#x} not within bounds {:#x}<->{:#x}. Trying anyways..".format(__name__, self.owner.name, offset, min, max))
 
+        # if the offset is within a member, then we can just use the index
         res = offset - self.baseoffset
+        index = bisect.bisect_right(starts, res) - 1
+        if not self.owner.ptr.is_union() and index >= 0 and res < stops[index]:
+            return member_t(self.owner, index)
+
         mem = idaapi.get_member(self.owner.ptr, res)
         if mem is None:
             logging.info("{:s}.instance({:s}).members.near_offset : Unable to locate member at offset {:+#x}. Trying get_best_fit_member instead.".format(__name__, self.owner.name, res))
@@ -953,10 +1012,9 @@ class members_t(object):
         '''Display all the fields within the specified structure.'''
         result = []
         mn, ms = 0, 0
-        for i in six.moves.range(len(self)):
-            m = self[i]
-            name, t, ofs, size, comment, tag = m.name, m.type, m.offset, m.size, m.comment, m.tag()
-            result.append((i, name, t, ofs, size, comment, tag))
+        for m in self.snapshot():
+            i, name, t, ofs, size, comment = m.index, m.name, m.type, m.offset, m.size, m.comment
+            result.append((i, name, t, ofs, size, comment, m.member.tag() if comment and '\n' in comment else None))
             mn = max((mn, len(name)))
             ms = max((ms, len("{:+#x}".format(size))))
         mi = len("{:d}".format(len(self)))
@@ -1062,12 +1120,15 @@ class member_t(object):
     @property
     def typeid(self):
         '''Return the `.tid` attribute of the type of the member.'''
+        return self.__typeid__(self.ptr)
+    @staticmethod
+    def __typeid__(mptr):
         opinfo = idaapi.opinfo_t()
         if idaapi.__version__ < 7.0:
-            res = idaapi.retrieve_member_info(self.ptr, opinfo)
+            res = idaapi.retrieve_member_info(mptr, opinfo)
             return None if res is None else res.tid if res.tid != idaapi.BADADDR else None
         else:
-            res = idaapi.retrieve_member_info(opinfo, self.ptr)
+            res = idaapi.retrieve_member_info(opinfo, mptr)
         return None if opinfo.tid == idaapi.BADADDR else opinfo.tid
     @property
     def index(self):
@@ -1167,15 +1228,18 @@ class member_t(object):
     @property
     def type(self):
         '''Return the type of the member in its pythonic form.'''
-        res = interface.typemap.dissolve(self.flag, self.typeid, self.size)
+        return self.__type__(self.flag, self.typeid, self.size, self.offset)
+    @staticmethod
+    def __type__(flag, typeid, size, offset):
+        res = interface.typemap.dissolve(flag, typeid, size)
         if isinstance(res, structure_t):
-            res = __instance__(res.id, offset=self.offset)
+            res = __instance__(res.id, offset=offset)
         elif isinstance(res, tuple):
             t, sz = res
             if isinstance(t, structure_t):
-                t = __instance__(t.id, offset=self.offset)
+                t = __instance__(t.id, offset=offset)
             elif isinstance(t, types.ListType) and isinstance(t[0], structure_t):
-                t[0] = __instance__(t[0].id, offset=self.offset)
+                t[0] = __instance__(t[0].id, offset=offset)
             res = t, sz
         return res
     @type.setter
@@ -1251,6 +1315,29 @@ class member_t(object):
             res.extend( interface.OREF(ea, int(op), interface.ref_t.of(t)) for op in ops)
         return res
 
+class record_t(collections.namedtuple('record_t', ('owner', 'index', 'id', 'offset', 'size', 'flag', 'typeid', 'name', 'fullname', 'comment', 'type'))):
+    """
+    This object is a read-only snapshot of the attributes of a single
+    member belonging to a structure. These are returned by the
+    `members_t.snapshot` method so that a number of members can have
+    their attributes fetched at once. The `member` property can be
+    used to get the `member_t` that the record was created from.
+    """
+    __slots__ = ()
+
+    @property
+    def member(self):
+        '''Return the `member_t` that this record was created from.'''
+        return member_t(self.owner, self.index)
+    @property
+    def left(self):
+        '''Return the beginning offset of the member.'''
+        return self.offset - self.owner.members.baseoffset
+    @property
+    def right(self):
+        '''Return the ending offset of the member.'''
+        return self.left + self.size
+
 #strpath_t
 #op_stroff(ea, n, tid_t* path, int path_len, adiff_t delta)
 #get_stroff_path(ea, n, tid_t* path, adiff_t delta)
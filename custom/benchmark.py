@@ -0,0 +1,55 @@
+"""
+Benchmark module
+
+This module is provided to a user to allow one to measure how long
+some of the cached conversions take in the current database. Each
+function returns a dictionary containing the number of seconds that
+were taken with and without the cache so that they can be compared.
+
+To measure how long it takes to convert the type of every structure
+member to and from a pythonic type, use the following::
+
+    > custom.benchmark.typemap()
+
+"""
+
+import six, sys, time
+
+import structure as struc
+import internal
+
+output = sys.stderr
+
+def __measure(callable, items, iterations):
+    '''Return the number of seconds taken to call ``callable`` with each item in ``items`` for ``iterations`` number of times.'''
+    ts = time.time()
+    for _ in six.moves.range(iterations):
+        for item in items:
+            callable(*item)
+        continue
+    return time.time() - ts
+
+def typemap(iterations=16):
+    """Measure how long it takes to resolve and dissolve the type of every structure member for ``iterations`` number of times.
+
+    Returns a dictionary containing the seconds taken by `typemap.resolve` and
+    `typemap.dissolve` when they are cached and when they are not.
+    """
+    Ftypemap = internal.interface.typemap
+
+    # collect the parameters for each structure member so that we're only measuring the conversions
+    dissolved = [(m.flag, m.typeid, m.size) for st in struc.iterate() for m in st.members]
+    resolved = [(Ftypemap.dissolve(*item),) for item in dissolved]
+    print >>output, "typemap: measuring the conversion of {:d} member{:s} for {:d} iteration{:s}".format(len(dissolved), '' if len(dissolved) == 1 else 's', iterations, '' if iterations == 1 else 's')
+
+    res = {}
+    Ftypemap.__invalidate__()
+    res['dissolve'] = __measure(Ftypemap.dissolve, dissolved, iterations)
+    res['resolve'] = __measure(Ftypemap.resolve, resolved, iterations)
+    res['dissolve (uncached)'] = __measure(Ftypemap._typemap__dissolve, dissolved, iterations)
+    res['resolve (uncached)'] = __measure(Ftypemap._typemap__resolve, resolved, iterations)
+
+    for name in ('dissolve', 'resolve'):
+        cached, uncached = res[name], res["{:s} (uncached)".format(name)]
+        print >>output, "typemap: {:s} took {:.3f}s cached and {:.3f}s uncached ({:.1f}x)".format(name, cached, uncached, uncached / cached if cached else 0.0)
+    return res
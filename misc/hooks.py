@@ -11,7 +11,7 @@ import six
 import sys, logging
 import functools, operator, itertools, types
 
-import database,function,ui
+import database,function,instruction,segment,structure,enumeration,ui
 import internal
 from internal import comment,utils
 
@@ -269,7 +269,22 @@ State = None
 def on_init(idp_modname):
     '''IDP_Hooks.init'''
 
-    # Database has just been opened, setup the initial state.
+    # Database has just been opened, so discard anything that was cached for the previous one.
+    instruction.cache.clear()
+    function.blocks.__invalidate__(0, idaapi.BADADDR)
+    function.chunks.__invalidate__()
+    function.frame.__invalidate__()
+    structure.members_t.__invalidate__()
+    internal.interface.typemap.__invalidate__()
+    enumeration.members.__invalidate__()
+    segment.cache.clear()
+    database.imports.__changed__()
+    database.entries.__invalidate__()
+    database.marks.__invalidate__()
+    database.xref.__reset__()
+    database.callgraph.__reset__()
+
+    # Setup the initial state.
     global State
     if State == None:
         State = state.init
@@ -362,6 +377,11 @@ def __process_functions(percentage=0.10):
     p.close()
 
 def rebase(info):
+    # every address has moved, so discard anything that was cached by its address
+    instruction.cache.clear()
+    function.blocks.__invalidate__(0, idaapi.BADADDR)
+    function.chunks.__invalidate__()
+
     functions, globals = map(utils.fcompose(sorted, list), (database.functions(), internal.netnode.alt.fiter(internal.comment.tagging.node())))
 
     p = ui.Progress()
@@ -443,6 +463,15 @@ def __rebase_globals(old, new, size, iterable):
 
 # address naming
 def rename(ea, newname):
+    # the name of an entry point may have changed
+    if database.entries.__cache__ is not None and ea in database.entries.__cache__[3]:
+        database.entries.__invalidate__()
+
+    # an import may have been added to a module that already exists
+    seg = idaapi.getseg(ea)
+    if seg and (seg.type == idaapi.SEG_XTRN or seg.startEA in database.imports.__segments__):
+        database.imports.__changed__()
+
     fl = database.type.flags(ea)
     labelQ, customQ = (fl & n == n for n in {idaapi.FF_LABL, idaapi.FF_NAME})
     #r, fn = database.xref.up(ea), idaapi.get_func(ea)
@@ -486,12 +515,124 @@ def extra_cmt_changed(ea, line_idx, cmt):
         continue
     return
 
+### byte scope
+def byte_patched(ea, *old_value):
+    '''IDB_Hooks.byte_patched'''
+    database.view.__invalidate__(ea, ea + 1)
+    instruction.cache.discard(ea, ea + 1)
+    function.blocks.__invalidate__(ea, ea + 1)
+    database.callgraph.__invalidate__(ea)
+    database.xref.__changed__()
+
+def make_code(*args):
+    '''IDB_Hooks.make_code'''
+    # IDA < 7.0 gives us the address and size, whereas newer versions give us an idaapi.insn_t
+    if idaapi.__version__ < 7.0:
+        ea, size = args
+    else:
+        insn, = args
+        ea, size = insn.ea, insn.size
+    instruction.cache.discard(ea, ea + size)
+    function.blocks.__invalidate__(ea, ea + size)
+    database.callgraph.__invalidate__(ea, ea + size)
+    database.xref.__changed__()
+
+def make_data(ea, flags, tid, size):
+    '''IDB_Hooks.make_data'''
+    instruction.cache.discard(ea, ea + size)
+    function.blocks.__invalidate__(ea, ea + size)
+    database.callgraph.__invalidate__(ea, ea + size)
+    database.xref.__changed__()
+
+def destroyed_items(ea1, ea2, will_disable_range):
+    '''IDB_Hooks.destroyed_items'''
+    instruction.cache.discard(ea1, ea2)
+    function.blocks.__invalidate__(ea1, ea2)
+    database.callgraph.__invalidate__(ea1, ea2)
+    database.xref.__changed__()
+
+def xref_changed(frm, to, *args):
+    '''IDP_Hooks.add_cref, add_dref, del_cref, del_dref'''
+    # a reference can split a block at its target, change the successors of its source, or be a call
+    function.blocks.__invalidate__(frm, frm + 1)
+    function.blocks.__invalidate__(to, to + 1)
+    database.callgraph.__invalidate__(frm, frm + 1)
+    database.xref.__changed__()
+
+def type_changed(ea, *args):
+    '''IDB_Hooks.op_type_changed, op_ti_changed, ti_changed'''
+    # changing an operand into an offset or applying a type can add or remove references
+    database.xref.__changed__()
+
+### segment scope
+def segm_attrs_changed(*args):
+    '''IDB_Hooks.segm_attrs_changed, segm_attrs_updated'''
+    # the bitness of a segment determines how each of its instructions are decoded
+    segment.cache.clear()
+    instruction.cache.clear()
+
+def sgr_changed(start, end, *args):
+    '''IDB_Hooks.sgr_changed'''
+    # the value of a segment register can change how the instructions within its range are decoded
+    segment.cache.clear()
+    instruction.cache.discard(start, end)
+
+### structure scope
+def struc_changed(sptr, *args):
+    '''IDB_Hooks.struc_member_created, struc_member_deleted, struc_member_renamed, struc_member_changed, struc_expanded, deleting_struc, struc_cmt_changed'''
+    if isinstance(sptr, idaapi.struc_t):
+        id = sptr.id
+
+    # we were given an identifier, which could belong to a structure or one of its members
+    else:
+        st = idaapi.get_struc(sptr)
+        if st is None:
+            _, _, st = idaapi.get_member_by_id(sptr)
+        id = None if st is None else st.id
+
+    function.frame.__invalidate__(id)
+    structure.members_t.__invalidate__(id)
+    internal.interface.typemap.__invalidate__()
+
+### enumeration scope
+def enum_changed(id, *args):
+    '''IDB_Hooks.enum_created, deleting_enum, renaming_enum, enum_bf_changed, enum_cmt_changed, enum_member_created, deleting_enum_member'''
+
+    # the identifier could belong to an enumeration or one of its members
+    eid = id if idaapi.get_enum_idx(id) != idaapi.BADADDR else idaapi.get_enum_member_enum(id)
+    enumeration.members.__invalidate__(None if eid == idaapi.BADADDR else eid)
+
 ### function scope
 def thunk_func_created(pfn):
     pass
 
+def func_updated(pfn):
+    '''IDB_Hooks.func_updated, func_noret_changed'''
+    # the flags of the function (such as whether it returns) determine the boundaries of its blocks
+    function.blocks.__invalidate__(pfn.startEA)
+    function.chunks.__valid__ and [ function.chunks.__insert__(l, r, pfn.startEA) for l, r in function.chunks(pfn) ]
+
+def tail_owner_changed(tail, owner_func, *old_owner):
+    '''IDB_Hooks.tail_owner_changed'''
+    function.blocks.__invalidate__(owner_func)
+    database.callgraph.__invalidate__(owner_func)
+
+    # IDA < 7.0 doesn't give us the previous owner, and it's already been changed by
+    # the time we're called. so, discard anything that includes the tail instead.
+    if old_owner:
+        previous, = old_owner
+        function.blocks.__invalidate__(previous)
+        database.callgraph.__invalidate__(previous)
+    else:
+        function.blocks.__invalidate__(tail.startEA, tail.endEA)
+        database.callgraph.__sites__(tail.startEA, tail.endEA)
+    function.chunks.__reassign__(tail.startEA, owner_func)
+
 def func_tail_appended(pfn, tail):
     global State
+    function.blocks.__invalidate__(pfn.startEA)
+    database.callgraph.__invalidate__(pfn.startEA)
+    function.chunks.__insert__(tail.startEA, tail.endEA, pfn.startEA)
     if State != state.ready: return
     # tail = func_t
     for ea in database.address.iterate(tail.startEA, tail.endEA):
@@ -504,6 +645,9 @@ def func_tail_appended(pfn, tail):
 
 def removing_func_tail(pfn, tail):
     global State
+    function.blocks.__invalidate__(pfn.startEA)
+    database.callgraph.__invalidate__(pfn.startEA)
+    function.chunks.__remove__(tail.startEA)
     if State != state.ready: return
     # tail = area_t
     for ea in database.address.iterate(tail.startEA, tail.endEA):
@@ -516,6 +660,9 @@ def removing_func_tail(pfn, tail):
 
 def add_func(pfn):
     global State
+    function.blocks.__invalidate__(pfn.startEA)
+    database.callgraph.__invalidate__(pfn.startEA)
+    function.chunks.__valid__ and [ function.chunks.__insert__(l, r, pfn.startEA) for l, r in function.chunks(pfn) ]
     if State != state.ready: return
     # convert all globals into contents
     for l, r in function.chunks(pfn):
@@ -530,6 +677,9 @@ def add_func(pfn):
 
 def del_func(pfn):
     global State
+    function.blocks.__invalidate__(pfn.startEA)
+    database.callgraph.__invalidate__(pfn.startEA)
+    function.chunks.__valid__ and [ function.chunks.__remove__(l) for l, _ in function.chunks(pfn) ]
     if State != state.ready: return
     # convert all contents into globals
     for l, r in function.chunks(pfn):
@@ -549,6 +699,9 @@ def del_func(pfn):
 
 def set_func_start(pfn, new_start):
     global State
+    function.blocks.__invalidate__(pfn.startEA)
+    database.callgraph.__invalidate__(pfn.startEA), database.callgraph.__invalidate__(new_start)
+    function.chunks.__resize__(pfn.startEA, new_start, pfn.endEA)
     if State != state.ready: return
     # new_start has removed addresses from function
     # replace contents with globals
@@ -575,6 +728,9 @@ def set_func_start(pfn, new_start):
 
 def set_func_end(pfn, new_end):
     global State
+    function.blocks.__invalidate__(pfn.startEA)
+    database.callgraph.__invalidate__(pfn.startEA)
+    function.chunks.__resize__(pfn.startEA, pfn.startEA, new_end)
     if State != state.ready: return
     # new_end has added addresses to function
     # replace globals with contents
@@ -17,11 +17,13 @@ import six, sys, logging
 from six.moves import builtins
 
 import functools, operator, itertools, types
-import logging
+import logging, collections
 
-import database, function as func, instruction, segment
+import database, function as func, instruction, segment, enumeration
 import ui, internal
 
+import idaapi
+
 def map(F, **kwargs):
     """Execute the callback ``F`` on all functions in the database. Synonymous to ``map(F, database.functions())`` but with some extra logging to display the current progress.
 
@@ -46,6 +48,42 @@ def map(F, **kwargs):
             print("{:#x}: terminated at # {:d} of {:d} : {:s}".format(ea, i+1, total, func.name(ea)))
     return result
 
+def payload(ea):
+    """Return a picklable payload for the function at ``ea`` that can be processed outside of IDA.
+
+    The payload is a tuple composed of the function's address, its name,
+    the bounds of each of its chunks, and the columns of every instruction
+    as returned by `function.decode`.
+    """
+    fn = func.by(ea)
+    return func.top(fn), func.name(fn), [tuple(bounds) for bounds in func.chunks(fn)], tuple(func.decode(fn))
+
+def mapreduce(F, reduce=None, initial=None, **options):
+    """Execute the callback ``F`` in parallel on a payload extracted from each function in the database.
+
+    The payload for each function is produced by the ``extract`` option, which
+    defaults to `tools.payload`, and is extracted in batches on IDA's thread.
+    The callback ``F`` is then executed on the payloads, either in-process or
+    by a pool of processes if ``processes`` is specified, and thus must be a
+    picklable function that does not depend on IDA. If
+    ``reduce`` is specified, then it is used to merge each result into ``initial``.
+    Otherwise a list of the results for each function is returned. The other
+    options are passed to `internal.utils.mapreduce` unmodified.
+    """
+    extract, all = options.pop('extract', payload), options.pop('functions', None) or database.functions()
+
+    p = ui.Progress()
+    p.update(current=0, min=0, max=len(all), title="Processing {:d} function{:s}...".format(len(all), '' if len(all) == 1 else 's'))
+    def progress(current, total):
+        p.update(current=current, text="Processed {:d} of {:d} function{:s}".format(current, total, '' if total == 1 else 's'))
+        return p.canceled
+
+    p.open()
+    try:
+        return internal.utils.mapreduce(F, all, extract, reduce, initial, progress=progress, **options)
+    finally:
+        p.close()
+
 # For poor folk without a dbgeng
 class remote(object):
     """
@@ -182,55 +220,155 @@ def checkmarks():
         print >>sys.stdout, '\n'.join( ("- {:#x} : {:s}".format(a, m) for a, m in sorted(v)) )
     return
 
-def collect(ea, sentinel):
+def traverse(graph, start, sentinel=(), depth=None):
+    """Return the index of each node in the `interface.digraph_t` ``graph`` that is reachable from the node at index ``start``.
+
+    If ``sentinel`` is specified, then it contains the indices of the
+    nodes that traversal will not continue into. If ``depth`` is
+    specified, then traversal will stop at the given number of edges
+    away from ``start``. The nodes are returned in the order that they
+    were visited.
+    """
+    visited = bytearray(len(graph))
+    for index in sentinel:
+        visited[index] = 1
+    visited[start] = 1
+
+    # walk breadth-first using a worklist so that we can bound the depth
+    result, queue = [start], collections.deque([(start, 0)])
+    while queue:
+        index, level = queue.popleft()
+        if depth is not None and level >= depth:
+            continue
+        for item in graph.successors(index):
+            if visited[item]:
+                continue
+            visited[item] = 1
+            result.append(item)
+            queue.append((item, level + 1))
+        continue
+    return result
+
+def collect(ea, sentinel, depth=None):
     """Collect all the basic blocks starting at address ``ea`` and recurse until a terminating block is encountered.
 
     If the set ``sentinel`` is specified, then its addresses are used as
     sentinel blocks and collection will terminate when those blocks are
-    reached.
+    reached. If ``depth`` is specified, then only collect the blocks
+    that are within that many edges of ``ea``.
     """
     if isinstance(sentinel, list):
         sentinel = set(sentinel)
     if not all((sentinel, isinstance(sentinel, set))):
         raise AssertionError("{:s}.collect({:#x}, {!r}) : Sentinel is empty or not a set.".format(__name__, ea, sentinel))
-    def _collect(addr, result):
-        process = set()
-        for blk in builtins.map(func.block, func.block.after(addr)):
-            if any(blk in coll for coll in (result, sentinel)):
-                continue
-            process.add(blk)
-        for addr, _ in process:
-            result |= _collect(addr, result | process)
-        return result
-    addr, _ = blk = func.block(ea)
-    return _collect(addr, set([blk]))
 
-def collectcall(ea, sentinel=set()):
+    # the block model is cached by the function, so we can reuse its graph between queries
+    graph, model = func.blocks.cfg(ea), func.blocks.model(ea)
+    start, _ = func.block(ea)
+
+    # convert the sentinel blocks (or addresses) into indices for the graph
+    indices = (model.index(item[0] if isinstance(item, tuple) else item) for item in sentinel)
+    result = traverse(graph, model.index(start), {index for index in indices if index is not None}, depth)
+    return {internal.interface.bounds_t(model.blocks[index].startEA, model.blocks[index].endEA) for index in result}
+
+def collectcall(ea, sentinel=set(), depth=None):
     """Collect all of the function calls starting at function ``ea`` and recurse until a terminating function is encountered.
 
     If the set ``sentinel`` is specified, then its addresses are used as
     sentinel functions and collection will terminate when one of those
-    functions are reached.
+    functions are reached. If ``depth`` is specified, then only collect
+    the functions that are within that many calls of ``ea``.
     """
     if isinstance(sentinel, list):
         sentinel = set(sentinel)
     if not isinstance(sentinel, set):
         raise AssertionError("{:s}.collectcall({:#x}, {!r}) : Sentinel is not a set.".format(__name__, ea, sentinel))
-    def _collectcall(addr, result):
-        process = set()
-        for f in func.down(addr):
-            if any(f in coll for coll in (result, sentinel)):
+
+    # the call graph is shared between queries until the database is modified
+    graph, addr = database.callgraph(), func.top(ea)
+    try:
+        start = graph.index(addr)
+    except KeyError:
+        return {addr}
+
+    indices = (graph.index(item) for item in sentinel if item in graph)
+    result = {graph.nodes[index] for index in traverse(graph, start, set(indices), depth)}
+    for f in result:
+        if not func.within(f):
+            logging.warn("{:s}.collectcall({:#x}, {!r}) : Adding non-function address {:#x} ({:s}).".format(__name__, ea, sentinel, f, database.name(f)))
+        continue
+    return result
+
+def annotate(enums, *locations, **options):
+    """Apply the enumerations in ``enums`` to each immediate operand within ``locations`` that contains one of their values.
+
+    Each of the ``locations`` can be either a function or a tuple containing the
+    bounds of an address range. If no locations are specified, then every function
+    in the database will be used. If a value belongs to more than one of the
+    enumerations, then the earliest one in ``enums`` is chosen. Operands that already
+    have a representation are left alone unless the ``force`` option is true. If
+    the ``dryrun`` option is true, then the matches are returned without applying them.
+
+    A list of ``(address, opnum, value, enum, name)`` for each match is returned.
+    """
+    eids = [enumeration.by(item) for item in (enums if isinstance(enums, (builtins.list, builtins.set, builtins.tuple)) else [enums])]
+    force, dryrun = options.get('force', False), options.get('dryrun', False)
+
+    # build the index of each value to the enumeration and member that it will be annotated with
+    index = {}
+    for eid in eids:
+        order, _, _ = enumeration.members.__table__(eid)
+        for _, name, value in order:
+            index.setdefault(value, (eid, name))
+        continue
+
+    def addresses(locations):
+        for item in locations:
+            if isinstance(item, builtins.tuple):
+                start, end = item
+                for ea in itertools.ifilter(database.type.is_code, database.address.iterate(start, end)):
+                    yield ea
+                continue
+            for ea in func.iterate(item):
+                yield ea
+            continue
+        return
+
+    # decode each instruction once and collect the immediates that are in our index
+    result, visited = [], builtins.set()
+    Fdefined = idaapi.isDefArg if idaapi.__version__ < 7.0 else idaapi.is_defarg
+    for ea in addresses(locations or database.functions()):
+        if ea in visited: continue
+        visited.add(ea)
+
+        flags = database.type.flags(ea)
+        for opnum, op in enumerate(instruction.at(ea).Operands):
+            if op.type == idaapi.o_void:
+                break
+            elif op.type != idaapi.o_imm:
                 continue
-            if not func.within(f):
-                logging.warn("{:s}.collectcall({:#x}, {!r}) : Adding non-function address {:#x} ({:s}).".format(__name__, ea, sentinel, f, database.name(f)))
-                result.add(f)
+            elif not force and Fdefined(flags, opnum):
                 continue
-            process.add(f)
-        for addr in process:
-            result |= _collectcall(addr, result | process)
+
+            # immediates are sign-extended, so clamp them to the size of the operand
+            size = idaapi.get_dtyp_size(op.dtyp)
+            value = op.value & (pow(2, 8 * size) - 1) if size else op.value
+            if value in index:
+                eid, name = index[value]
+                result.append((ea, opnum, value, eid, name))
+            continue
+        continue
+
+    if dryrun:
+        logging.info("{:s}.annotate({!r}) : Found {:d} operand{:s} that can be annotated with {:d} enumeration{:s}.".format(__name__, enums, len(result), '' if len(result) == 1 else 's', len(eids), '' if len(eids) == 1 else 's'))
         return result
-    addr = func.top(ea)
-    return _collectcall(addr, set([addr]))
+
+    # now we can apply each of the matches that we found
+    for ea, opnum, value, eid, name in result:
+        if not idaapi.op_enum(ea, opnum, eid, 0):
+            logging.warn("{:s}.annotate({!r}) : Unable to apply enumeration member {:s} ({:#x}) to operand {:d} at {:#x}.".format(__name__, enums, name, value, opnum, ea))
+        continue
+    return result
 
 # FIXME: Don't emit the +0 if offset is 0
 def above(ea, includeSegment=False):
@@ -0,0 +1,39 @@
+"""
+Tests for `internal.utils.mapreduce`.
+
+These don't depend on IDA, so they can be run with any python 2
+interpreter from the root of the repository::
+
+    $ python -m unittest discover -s tests
+
+"""
+import os, operator, imp, unittest
+
+utils = imp.load_source('_utils', os.path.join(os.path.dirname(__file__), os.pardir, 'base', '_utils.py'))
+
+def square(number):
+    return number * number
+
+class mapreduce(unittest.TestCase):
+    def test_results_in_order(self):
+        self.assertEqual(utils.mapreduce(square, range(0x100), batch=7), [n * n for n in range(0x100)])
+
+    def test_reduce(self):
+        self.assertEqual(utils.mapreduce(square, range(10), reduce=operator.add, initial=0), sum(n * n for n in range(10)))
+
+    def test_extract(self):
+        self.assertEqual(utils.mapreduce(square, ['1', '2', '3'], extract=int), [1, 4, 9])
+
+    def test_empty(self):
+        self.assertEqual(utils.mapreduce(square, [], reduce=operator.add, initial=42), 42)
+
+    def test_progress_cancel(self):
+        res = utils.mapreduce(square, range(0x100), batch=0x10, interval=0, progress=lambda completed, total: completed >= 0x20)
+        self.assertEqual(res, [n * n for n in range(0x20)])
+
+    @unittest.skipIf(os.name == 'nt', 'a pool requires an interpreter to spawn on windows')
+    def test_pool(self):
+        self.assertEqual(utils.mapreduce(square, range(0x40), processes=2, batch=8), [n * n for n in range(0x40)])
+
+if __name__ == '__main__':
+    unittest.main()